@@ -1,24 +1,100 @@
 import streamlit as st
-import pickle
 import time
+_run_start = time.perf_counter()
+import os
+import json
+import collections
+import functools
+import hmac
+import tempfile
+import threading
+import weakref
 import streamlit.components.v1 as components
-import math
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
+import numpy as np
+import pandas as pd
+
+import aqi_index
+import assets
+import batch
+import cache
+import forecast
+import history
+import rollups
+import ingest
+import metrics
+import quality
+import registry
+import gauge
+import whatif
 
 # Page config
 st.set_page_config(page_title="AQI Predictor", page_icon="🌿", layout="centered")
 
+# --- Instrumentation ---
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serves stage timings at :AQI_METRICS_PORT/metrics (default 9464, 0 disables), once per process."""
+    port = int(os.environ.get("AQI_METRICS_PORT", 9464))
+    if not port:
+        return None
+    try:
+        return metrics.serve(os.environ.get("AQI_METRICS_HOST", "127.0.0.1"), port)
+    except OSError:
+        return None  # port taken, e.g. by another app process
+
+metrics_server = start_metrics_endpoint()
+
+def start_session_profiler():
+    """Starts sampling this script run if profiling is switched on for this session."""
+    leftover = st.session_state.pop("_active_profiler", None)
+    if leftover is not None:  # the previous run stopped early (st.rerun, st.stop)
+        stop_session_profiler(leftover)
+    if not st.session_state.get("profile_session"):
+        return None
+    profiler = metrics.SamplingProfiler().start()
+    st.session_state["_active_profiler"] = profiler
+    return profiler
+
+def stop_session_profiler(profiler):
+    if profiler is None:
+        return
+    profiler.stop()
+    st.session_state.pop("_active_profiler", None)
+    st.session_state.setdefault("profile_samples", collections.Counter()).update(profiler.samples)
+
+def profiled(fragment):
+    """Times every run of a fragment (stage "fragment_<name>") and profiles fragment-only reruns.
+
+    Full runs are covered by the script-level profiler.
+    """
+    stage = f"fragment_{fragment.__name__}"
+
+    @functools.wraps(fragment)
+    def wrapper(*args, **kwargs):
+        if "_active_profiler" in st.session_state or not st.session_state.get("profile_session"):
+            with metrics.span(stage):
+                return fragment(*args, **kwargs)
+        profiler = start_session_profiler()
+        try:
+            with metrics.span(stage):
+                return fragment(*args, **kwargs)
+        finally:
+            stop_session_profiler(profiler)
+    return wrapper
+
+script_profiler = start_session_profiler()
+# --- End Instrumentation ---
+
 # --- Current Location & Time Logic ---
 INDIA_TIMEZONE = 'Asia/Kolkata'
 try:
     indian_tz = pytz.timezone(INDIA_TIMEZONE)
     now_in_india = datetime.now(indian_tz)
     current_date_time_str = now_in_india.strftime("%A, %B %d, %Y at %I:%M:%S %p %Z%z")
-    current_location_str = "Kottakkal, Kerala, India"
 except Exception as e:
     current_date_time_str = f"Error getting time: {e}"
-    current_location_str = "Unknown Location"
 # --- End Current Location & Time Logic ---
 
 # Initialize 'color' with a default value for the CSS to prevent NameError
@@ -26,9 +102,13 @@ except Exception as e:
 initial_needle_color = "#6c757d" # A neutral gray
 
 # Enhanced CSS with blue and violet gradient, and advanced meter styling
-st.markdown(f"""
+@st.cache_resource
+def page_css():
+    """Builds the page stylesheet once per process."""
+    return f"""
     <style>
-        @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&family=Roboto:wght@300;400;700&display=swap');
+        /* Self-hosted fonts (see assets.py) */
+        {assets.font_face_css()}
 
         /* Define new gradient colors */
         :root {{
@@ -292,13 +372,33 @@ st.markdown(f"""
             text-anchor: middle;
         }}
     </style>
-""", unsafe_allow_html=True)
+"""
+
+with metrics.span("render_css"):
+    st.markdown(page_css(), unsafe_allow_html=True)
+
+# Location & Model
+@st.cache_resource
+def get_model_registry():
+    """One model registry per process; models load on first use and are evicted LRU."""
+    max_mb = float(os.environ.get("AQI_MODEL_CACHE_MB", registry.DEFAULT_MAX_BYTES / 1024 / 1024))
+    return registry.ModelRegistry(max_bytes=int(max_mb * 1024 * 1024))
+
+model_registry = get_model_registry()
+location = st.sidebar.selectbox("📍 Location", model_registry.locations())
+
+# Heavy media is opt-in; the ambience track is only offered once `python assets.py fetch` has downloaded it
+show_trees = st.sidebar.toggle("🌳 Tree animation", value=True)
+play_ambience = st.sidebar.toggle(
+    "🔊 Forest ambience", value=False, disabled=not assets.available(assets.AMBIENCE_AUDIO),
+    help="Run `python assets.py fetch` to download the ambience track.",
+)
 
 # Title
 st.markdown("<h1 class='main-title'>🌿 AIR QUALITY INDEX PREDICTION</h1>", unsafe_allow_html=True)
 
 # Display current time and location
-st.markdown(f"<p class='time-location'>Current Location: {current_location_str}</p>", unsafe_allow_html=True)
+st.markdown(f"<p class='time-location'>Current Location: {location}, India</p>", unsafe_allow_html=True)
 st.markdown(f"<p class='time-location'>Current Time: {current_date_time_str}</p>", unsafe_allow_html=True)
 
 
@@ -310,212 +410,699 @@ st.markdown("""
     <br><br>
     This project utilizes advanced Machine Learning techniques to accurately predict the Air Quality Index (AQI)
     based on real-time pollutant concentration data from Continuous Ambient Air Quality Monitoring Stations (CAAQMS)
-    across Kerala, India. Our aim is to provide timely and actionable insights into air quality, empowering
+    across India, with a model for each city or station. Our aim is to provide timely and actionable insights into air quality, empowering
     users with critical environmental information.
 </div>
 """, unsafe_allow_html=True)
 
-# Load Model
-@st.cache_resource
-def load_model():
-    """Loads the pre-trained machine learning model."""
+def current_model():
+    """Returns the selected location's model, (re)loading it if its files changed on disk."""
     try:
-        with open("li.pkl", 'rb') as file:
-            return pickle.load(file)
+        return model_registry.get(location)
     except FileNotFoundError:
-        st.error("Model file 'li.pkl' not found. Please ensure it's in the same directory.")
+        st.error(f"No model file found for {location}. Please ensure li.json / li.pkl or models/ are present.")
         return None
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
 
-classifier = load_model()
-
-# Inputs
-st.markdown("### 📊 Enter Pollutant Concentrations:")
-
-# Using columns for better layout of inputs
-col1, col2 = st.columns(2)
-
-with col1:
-    PM25 = st.number_input("PM2.5 (µg/m³)", min_value=0.0, help="Particulate Matter less than 2.5 micrometers in diameter.")
-    NO2 = st.number_input("NO2 (µg/m³)", min_value=0.0, help="Nitrogen Dioxide concentration.")
-    CO = st.number_input("CO (mg/m³)", min_value=0.0, help="Carbon Monoxide concentration.")
-
-with col2:
-    PM10 = st.number_input("PM10 (µg/m³)", min_value=0.0, help="Particulate Matter less than 10 micrometers in diameter.")
-    SO2 = st.number_input("SO2 (µg/m³)", min_value=0.0, help="Sulfur Dioxide concentration.")
-    Ozone = st.number_input("O3 (µg/m³)", min_value=0.0, help="Ozone concentration.")
+@st.cache_resource
+def get_prediction_cache():
+    """One prediction cache shared by every session in this process."""
+    resolution = os.environ.get("AQI_CACHE_RESOLUTION")
+    return cache.PredictionCache(
+        maxsize=int(os.environ.get("AQI_CACHE_SIZE", cache.DEFAULT_MAXSIZE)),
+        resolution=float(resolution) if resolution else cache.DEFAULT_RESOLUTION,
+    )
+
+# Load the model up front so load errors show at the top of the page
+current_model()
+prediction_cache = get_prediction_cache()
+
+@st.cache_data
+def load_training_report(path="train_report.json"):
+    """Loads the metrics/timing report written by train.py, if there is one."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
 
-# Prediction
-if st.button("🔍 Predict AQI"):
+training_report = load_training_report()
+if training_report is not None:
+    with st.expander(f"🧪 Model selection report (best: {training_report['best_model']})"):
+        st.caption(
+            f"{training_report['folds']}-fold cross-validation on {training_report['rows']} rows, "
+            f"{training_report['cv_seconds']:.2f}s with {training_report['jobs']} workers"
+        )
+        st.dataframe({
+            name: {metric: round(fold_metrics[metric], 4) for metric in ("rmse", "mae", "r2", "fit_seconds")}
+            for name, fold_metrics in training_report["models"].items()
+        })
+
+# Inputs, prediction, gauge and what-if are one fragment: editing a reading or clicking Predict
+# reruns only this block, and the what-if always sweeps around the readings on screen
+@st.fragment
+@profiled
+def prediction_section():
+    classifier = current_model()
+
+    # Inputs
+    st.markdown("### 📊 Enter Pollutant Concentrations:")
+
+    # Using columns for better layout of inputs
+    col1, col2 = st.columns(2)
+
+    with col1:
+        PM25 = st.number_input("PM2.5 (µg/m³)", min_value=0.0, key="input_PM2.5", help="Particulate Matter less than 2.5 micrometers in diameter.")
+        NO2 = st.number_input("NO2 (µg/m³)", min_value=0.0, key="input_NO2", help="Nitrogen Dioxide concentration.")
+        CO = st.number_input("CO (mg/m³)", min_value=0.0, key="input_CO", help="Carbon Monoxide concentration.")
+
+    with col2:
+        PM10 = st.number_input("PM10 (µg/m³)", min_value=0.0, key="input_PM10", help="Particulate Matter less than 10 micrometers in diameter.")
+        SO2 = st.number_input("SO2 (µg/m³)", min_value=0.0, key="input_SO2", help="Sulfur Dioxide concentration.")
+        Ozone = st.number_input("O3 (µg/m³)", min_value=0.0, key="input_O3", help="Ozone concentration.")
+
+    # Prediction
+    if st.button("🔍 Predict AQI"):
+        if classifier is None:
+            st.warning("Prediction cannot be performed as the model failed to load.")
+        else:
+            try:
+                input_data = [[PM25, PM10, NO2, SO2, CO, Ozone]]
+                with metrics.span("predict"):
+                    prediction = prediction_cache.predict(
+                        classifier, input_data, namespace=location, version=model_registry.signature(location)
+                    )
+                predicted_aqi = float(prediction[0])
+
+                # Add both balloons and snow
+                st.balloons()
+                st.snow()
+
+                st.toast("🎉 Prediction complete! Analyzing air quality...", icon="🌳")
+
+                # AQI Category & Color Mapping (same sorted lookup as the batch and server paths)
+                with metrics.span("category_lookup"):
+                    category, color, css_class, glow_class = aqi_index.category_info(predicted_aqi)
+
+                # Deterministic AQI from the CPCB breakpoint formula, shown alongside the model
+                formula_aqi, dominant = aqi_index.compute_aqi(input_data)
+                if np.isnan(formula_aqi[0]):
+                    formula_line = "Formula AQI (CPCB): outside the breakpoint table"
+                else:
+                    formula_line = (f"Formula AQI (CPCB): {formula_aqi[0]:.2f}, "
+                                    f"dominant pollutant {aqi_index.FEATURES[dominant[0]]}")
+
+                with metrics.span("render_result"):
+                    st.markdown(f"""
+                        <div class='prediction-result'>
+                            <h3 class='{css_class}'>
+                                Predicted AQI: {predicted_aqi:.2f}<br>
+                                Category: {category}
+                            </h3>
+                            <p>{formula_line}</p>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+                # Tree growing with forest ambience (self-hosted, opt-in via the sidebar)
+                if show_trees:
+                    tree_src = assets.asset_url(assets.TREE_IMAGE)
+                    st.markdown(f"""
+                        <div class="tree-animation-container">
+                            <img class="animated-tree" style="left: 10%; animation-delay: 0s;" src="{tree_src}" height="350px" loading="lazy" decoding="async" alt=""/>
+                            <img class="animated-tree" style="left: 40%; animation-delay: 1s;" src="{tree_src}" height="300px" loading="lazy" decoding="async" alt=""/>
+                            <img class="animated-tree" style="left: 70%; animation-delay: 0.5s;" src="{tree_src}" height="380px" loading="lazy" decoding="async" alt=""/>
+                        </div>
+                    """, unsafe_allow_html=True)
+                if play_ambience:
+                    st.markdown(f"""
+                        <audio autoplay loop preload="none">
+                            <source src="{assets.asset_url(assets.AMBIENCE_AUDIO)}" type="audio/mpeg">
+                            Your browser does not support the audio element.
+                        </audio>
+                    """, unsafe_allow_html=True)
+
+                # Analogue Meter with advanced styling (static arcs and labels are cached in gauge.py)
+                with metrics.span("render_gauge"):
+                    components.html(gauge.meter_html(predicted_aqi, color, glow_class), height=350)
+
+            except Exception as e:
+                st.error(f"An error occurred during prediction: {e}. Please ensure all inputs are valid numbers.")
+
+    whatif_panel(classifier, np.array([PM25, PM10, NO2, SO2, CO, Ozone], dtype=float))
+
+# What-if Analysis, drawn inside the prediction fragment (base is in whatif.FEATURES order)
+def whatif_panel(classifier, base):
+    st.markdown("### 🧪 What-if Analysis")
+    st.markdown(
+        "Sweep one or two pollutants over a dense grid, holding the others at the readings entered above, "
+        "and find the smallest cut that reaches a target category."
+    )
     if classifier is None:
-        st.warning("Prediction cannot be performed as the model failed to load.")
+        st.warning("What-if analysis needs the model, which failed to load.")
+        return
+
+    col_mode, col_target = st.columns(2)
+    two_d = col_mode.radio("Sweep", ["One pollutant", "Two pollutants"], horizontal=True) == "Two pollutants"
+    target_name = col_target.selectbox(
+        "Target category", list(whatif.TARGETS), index=1,
+        format_func=lambda name: f"{name} (AQI ≤ {whatif.TARGETS[name]:g})",
+    )
+    target = whatif.TARGETS[target_name]
+
+    col_x, col_y = st.columns(2)
+    x_name = col_x.selectbox("Pollutant", whatif.FEATURES, key="whatif_x")
+    y_name = None
+    if two_d:
+        y_name = col_y.selectbox("Second pollutant", [name for name in whatif.FEATURES if name != x_name],
+                                 key="whatif_y")
+    points = st.select_slider(
+        "Grid points" + (" per axis" if two_d else ""),
+        options=[100, 250, 500, 1000] if two_d else [1_000, 10_000, 100_000, 1_000_000],
+        value=500 if two_d else 10_000,
+    )
+
+    view = whatif_view(classifier, (location, model_registry.signature(location)), tuple(base.tolist()),
+                       x_name, y_name, points, target)
+    st.caption(f"{view['predictions']:,} predictions in {view['sweep_ms']:.1f} ms (one vectorized call)")
+    st.vega_lite_chart(view["chart"], width="stretch")
+
+    if two_d:
+        st.caption("Black line: the most of the second pollutant allowed at each level of the first to meet the target.")
+        best = view["best"]
+        if best is None:
+            st.warning(f"No point on this grid reaches {target_name}.")
+        else:
+            st.success(
+                f"Smallest combined cut on the grid: {x_name} to {best[x_name]:.2f} (−{best['cut'][x_name]:.1%}) "
+                f"and {y_name} to {best[y_name]:.2f} (−{best['cut'][y_name]:.1%}), predicted AQI {best['aqi']:.1f}."
+            )
+
+    for name, result in view["reductions"].items():
+        if result is None:
+            st.warning(f"Cutting {name} alone can't reach {target_name}, even to zero.")
+        elif result["reduction"] == 0:
+            st.info(f"The current readings already meet {target_name} (AQI ≤ {target:g}).")
+        else:
+            st.success(
+                f"Cut {name} alone by {result['reduction']:.2f} ({result['percent']:.1%}), "
+                f"from {result['current']:.2f} to {result['value']:.2f}, to reach {target_name} "
+                f"(predicted AQI {result['aqi']:.2f})."
+            )
+
+@st.cache_data(max_entries=32)
+def whatif_view(_classifier, namespace, base, x_name, y_name, points, target):
+    """Sweep, chart spec and reduction targets for one set of readings and settings.
+
+    Cached so that clicking Predict after entering readings doesn't redo the sweep and
+    solver; ``namespace`` (location, model files) stands in for the model.
+    """
+    base = np.array(base, dtype=float)
+    x_values = np.linspace(*whatif.default_range(x_name, base[whatif.FEATURES.index(x_name)]), points)
+    y_values = None
+    if y_name is not None:
+        y_values = np.linspace(*whatif.default_range(y_name, base[whatif.FEATURES.index(y_name)]), points)
+    start = time.perf_counter()
+    with metrics.span("whatif_sweep"):
+        aqi = whatif.sweep(_classifier, base, x_name, x_values, y_name, y_values)
+    sweep_ms = (time.perf_counter() - start) * 1000
+
+    best = None
+    if y_name is not None:
+        chart = whatif.heatmap_chart(x_name, x_values, y_name, y_values, aqi, target, base)
+        best = whatif.best_combined(base, x_name, x_values, y_name, y_values, aqi, target)
     else:
-        try:
-            input_data = [[PM25, PM10, NO2, SO2, CO, Ozone]]
-            prediction = classifier.predict(input_data)
-            predicted_aqi = float(prediction[0])
-
-            # Add both balloons and snow
-            st.balloons()
-            st.snow()
-
-            st.toast("🎉 Prediction complete! Analyzing air quality...", icon="🌳")
-
-            # AQI Category & Color Mapping
-            aqi_info = {
-                (0, 50): ("Good ✅", "#00FF00", "aqi-good", "glow-good"),
-                (51, 100): ("Moderate 🌤", "#ADFF2F", "aqi-moderate", "glow-moderate"),
-                (101, 150): ("Unhealthy for Sensitive Groups ⚠", "#FFA500", "aqi-sensitive", "glow-sensitive"),
-                (151, 200): ("Unhealthy 🛑", "#FF4500", "aqi-unhealthy", "glow-unhealthy"),
-                (201, 300): ("Very Unhealthy ☣", "#FF1493", "aqi-very-unhealthy", "glow-very-unhealthy"),
-                (301, 500): ("Hazardous ☠", "#8B0000", "aqi-hazardous", "glow-hazardous")
-            }
-
-            category, color, css_class, glow_class = "No Data / Extreme Value 💼", "#FFFFFF", "aqi-no-data", ""
-
-            for (low, high), (cat, col, css, glow) in aqi_info.items():
-                if low <= predicted_aqi <= high:
-                    category, color, css_class, glow_class = cat, col, css, glow
-                    break
-                elif predicted_aqi > 500: # Handle values beyond 500
-                    category, color, css_class, glow_class = "Hazardous ☠", "#8B0000", "aqi-hazardous", "glow-hazardous"
-                    break
-
-            st.markdown(f"""
-                <div class='prediction-result'>
-                    <h3 class='{css_class}'>
-                        Predicted AQI: {predicted_aqi:.2f}<br>
-                        Category: {category}
-                    </h3>
-                </div>
-            """, unsafe_allow_html=True)
-
-            # Tree growing with forest ambience
-            st.markdown("""
-                <div class="tree-animation-container">
-                    <img class="animated-tree" style="left: 10%; animation-delay: 0s;" src="https://i.imgur.com/gK5WfC0.png" height="350px"/>
-                    <img class="animated-tree" style="left: 40%; animation-delay: 1s;" src="https://i.imgur.com/gK5WfC0.png" height="300px"/>
-                    <img class="animated-tree" style="left: 70%; animation-delay: 0.5s;" src="https://i.imgur.com/gK5WfC0.png" height="380px"/>
-                </div>
-                <audio autoplay loop>
-                    <source src="https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3" type="audio/mpeg">
-                    Your browser does not support the audio element.
-                </audio>
-            """, unsafe_allow_html=True)
-
-            # Analogue Meter with advanced styling
-            aqi_normalized = min(max(0, predicted_aqi), 500)
-
-            # Adjusted for larger meter
-            cx, cy = 250, 250 # Center of the SVG viewBox
-            r = 180 # Radius of the main arc
-
-            start_angle_deg = 210
-            end_angle_deg = -30
-            angle_range_deg = start_angle_deg - end_angle_deg
-
-            current_angle_deg = start_angle_deg - (aqi_normalized / 500) * angle_range_deg
-            current_angle_rad = math.radians(current_angle_deg)
-
-            needle_length = r * 0.8
-            needle_tail_length = r * 0.15
-
-            # Needle coordinates
-            needle_x1 = cx - needle_tail_length * math.cos(current_angle_rad)
-            needle_y1 = cy - needle_tail_length * math.sin(current_angle_rad)
-            needle_x2 = cx + needle_length * math.cos(current_angle_rad)
-            needle_y2 = cy + needle_length * math.sin(current_angle_rad)
-
-            meter_segments = [
-                (0, 50, "#00FF00", "good", "Good"),
-                (51, 100, "#ADFF2F", "moderate", "Moderate"),
-                (101, 150, "#FFA500", "sensitive", "Sensitive"),
-                (151, 200, "#FF4500", "unhealthy", "Unhealthy"),
-                (201, 300, "#FF1493", "very-unhealthy", "Very Unhealthy"),
-                (301, 500, "#8B0000", "hazardous", "Hazardous")
-            ]
-
-            arc_paths = []
-            aqi_labels = []
-
-            # Function to calculate arc path (taken from your original code)
-            def polarToCartesian(centerX, centerY, radius, angleInDegrees):
-                angleInRadians = (angleInDegrees - 90) * math.pi / 180.0
-                return centerX + (radius * math.cos(angleInRadians)), centerY + (radius * math.sin(angleInRadians))
-
-            for start_aqi, end_aqi, seg_color, seg_class, label_text in meter_segments:
-                seg_start_angle_deg = start_angle_deg - (start_aqi / 500) * angle_range_deg
-                seg_end_angle_deg = start_angle_deg - (end_aqi / 500) * angle_range_deg
-
-                # Corrected calculation for SVG arcs (using your original function)
-                # For a sweep flag of 0, start_angle_deg should be greater than end_angle_deg
-                x1, y1 = polarToCartesian(cx, cy, r, seg_start_angle_deg - 90) # Adjust for polarToCartesian
-                x2, y2 = polarToCartesian(cx, cy, r, seg_end_angle_deg - 90)   # Adjust for polarToCartesian
+        chart = whatif.line_chart(x_name, x_values, aqi, target, base[whatif.FEATURES.index(x_name)])
+    reductions = {}
+    for name in [x_name] + ([y_name] if y_name is not None else []):
+        with metrics.span("whatif_solve"):
+            reductions[name] = whatif.min_reduction(_classifier, base, name, target)
+    return {"predictions": aqi.size, "sweep_ms": sweep_ms, "chart": chart, "best": best,
+            "reductions": reductions}
 
-                # Adjust large_arc_flag and sweep_flag for accurate arc drawing
-                large_arc_flag = 1 if abs(seg_end_angle_deg - seg_start_angle_deg) > 180 else 0
-                sweep_flag = 0 if seg_end_angle_deg < seg_start_angle_deg else 1 # Ensure correct sweep direction
+prediction_section()
 
-                path_d = f"M {x1:.3f} {y1:.3f} A {r} {r} 0 {large_arc_flag} {sweep_flag} {x2:.3f} {y2:.3f}"
-                arc_paths.append(f'<path d="{path_d}" fill="none" stroke="{seg_color}" class="meter-arc-segment {glow_class}"/>')
+# Batch Prediction reruns on its own as well
+# Browsers download through Streamlit's in-memory file store, so larger results are not offered
+MAX_DOWNLOAD_MB = float(os.environ.get("AQI_BATCH_DOWNLOAD_MB", 200))
 
-                # Add labels for each segment
-                mid_aqi = (start_aqi + end_aqi) / 2
-                label_angle_deg = start_angle_deg - (mid_aqi / 500) * angle_range_deg
-                label_angle_rad = math.radians(label_angle_deg)
-                label_r = r + 30 # Distance of label from center
-
-                label_x = cx + label_r * math.cos(label_angle_rad)
-                label_y = cy - label_r * math.sin(label_angle_rad) # Y-axis inverted for SVG
-
-                aqi_labels.append(f'<text x="{label_x:.1f}" y="{label_y:.1f}" class="aqi-label" fill="{seg_color}">{label_text}</text>')
-
-            all_arcs_svg = "\n".join(arc_paths)
-            all_labels_svg = "\n".join(aqi_labels)
-
-            components.html(f"""
-                <div class="analog-meter-container">
-                    <svg class="meter-svg" viewBox="0 0 500 300">
-                        <circle cx="250" cy="250" r="180" class="meter-dial" />
-
-                        <defs>
-                            <filter id="glow">
-                                <feGaussianBlur in="SourceGraphic" stdDeviation="6" result="blur" />
-                                <feColorMatrix in="blur" mode="matrix" values="
-                                    1 0 0 0 0
-                                    0 1 0 0 0
-                                    0 0 1 0 0
-                                    0 0 0 15 0" result="colormatrix" />
-                                <feMerge>
-                                    <feMergeNode in="colormatrix" />
-                                    <feMergeNode in="SourceGraphic" />
-                                </feMerge>
-                            </filter>
-                        </defs>
-
-                        {all_arcs_svg}
-
-                        <line x1="{needle_x1:.1f}" y1="{needle_y1:.1f}" x2="{needle_x2:.1f}" y2="{needle_y2:.1f}" stroke="{color}" class="meter-needle" />
-
-                        <circle cx="{cx}" cy="{cy}" r="12" class="meter-center" />
-
-                        <text x="250" y="270" class="meter-text">AQI</text>
-
-                        <text x="250" y="220" class="aqi-value-display">{predicted_aqi:.0f}</text>
-
-                        {all_labels_svg}
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def read_file(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+class BatchOutput:
+    """This session's batch result: one temp file, overwritten by every run and removed
+    when the session's state is dropped (the session ended) or the server exits."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="aqi_batch_", suffix=".csv")
+        os.close(fd)
+        self.remove = weakref.finalize(self, remove_file, self.path)
+
+@st.fragment
+@profiled
+def batch_section():
+    classifier = current_model()
+
+    # Batch Prediction
+    st.markdown("### 📁 Batch Prediction")
+    st.markdown(
+        "Score a whole station export (same columns as `Bangalore_AQI_Dataset.csv`). "
+        "Upload a CSV or give the path of a file on this machine; it is read and predicted in chunks."
+    )
+
+    uploaded_file = st.file_uploader("Upload station CSV", type=["csv"])
+    local_path = st.text_input("...or path to a local CSV", placeholder="/data/station_export.csv")
+    chunksize = st.number_input("Rows per chunk", min_value=1000, value=batch.DEFAULT_CHUNKSIZE, step=10000)
+
+    if st.button("📈 Run Batch Prediction"):
+        source = uploaded_file if uploaded_file is not None else local_path.strip()
+        if classifier is None:
+            st.warning("Batch prediction cannot be performed as the model failed to load.")
+        elif not source:
+            st.warning("Please upload a CSV file or enter a local path.")
+        elif isinstance(source, str) and not os.path.isfile(source):
+            st.error(f"File '{source}' not found.")
+        else:
+            try:
+                if isinstance(source, str):
+                    source_name = os.path.basename(source)
+                else:
+                    source.seek(0)
+                    source_name = source.name
+                download_name = os.path.splitext(source_name)[0] + "_predicted.csv"
+                # Sessions share this process, so each session writes its own file
+                if "batch_output" not in st.session_state:
+                    st.session_state["batch_output"] = BatchOutput()
+                output_path = st.session_state["batch_output"].path
+
+                status = st.empty()
+                with open(output_path, 'w', newline='') as out, metrics.span("batch_predict"):
+                    stats = batch.predict_file(
+                        classifier, source, out, int(chunksize),
+                        progress=lambda rows: status.text(f"Scored {rows:,} rows..."),
+                        last_by="City",
+                    )
+                status.empty()
+
+                col_rows, col_time, col_rate = st.columns(3)
+                col_rows.metric("Rows", f"{stats['rows']:,}")
+                col_time.metric("Time", f"{stats['seconds']:.2f} s")
+                col_rate.metric("Rows / second", f"{stats['rows_per_sec']:,.0f}")
+
+                size_mb = os.path.getsize(output_path) / 1024 / 1024
+                if size_mb <= MAX_DOWNLOAD_MB:
+                    st.success("Predictions are ready to download.")
+                    # Read from disk only when the button is clicked, not on every rerun
+                    st.download_button(
+                        "⬇ Download predictions",
+                        data=functools.partial(read_file, output_path),
+                        file_name=download_name,
+                        mime="text/csv",
+                        on_click="ignore",
+                    )
+                else:
+                    st.session_state.pop("batch_output").remove()
+                    st.warning(
+                        f"The predictions come to {size_mb:,.0f} MB, more than the {MAX_DOWNLOAD_MB:,.0f} MB "
+                        "offered for download (AQI_BATCH_DOWNLOAD_MB). Score files this large with "
+                        "`python batch.py input.csv output.csv` instead."
+                    )
+
+                # Daily bulletin: one gauge per station, at its latest reading
+                latest = stats["latest"]
+                if latest:
+                    with metrics.span("render_bulletin"):
+                        bulletin = gauge.bulletin_html(list(latest), list(latest.values()), "Daily AQI Bulletin")
+                    st.download_button(
+                        f"⬇ Download AQI bulletin ({len(latest):,} stations, print to PDF)",
+                        data=bulletin,
+                        file_name="aqi_bulletin.html",
+                        mime="text/html",
+                        on_click="ignore",
+                    )
+            except Exception as e:
+                st.error(f"An error occurred during batch prediction: {e}")
+
+batch_section()
+
+# Live Sensor Feed
+@st.cache_resource(validate=lambda pipeline: pipeline.running)
+def get_ingestion(jsonl_path, port):
+    """One ingestion pipeline per feed, shared by all sessions and scored with the default location's model.
+
+    A pipeline whose thread has stopped fails validation, so the next run starts a new one.
+    """
+    pipeline = ingest.Pipeline(lambda: model_registry.get(registry.DEFAULT_LOCATION),
+                               screen=quality.StreamValidator())
+    return pipeline.start(jsonl=jsonl_path or None, port=port or None)
+
+@st.fragment(run_every=2)
+@profiled
+def live_gauge(pipeline):
+    stats = pipeline.stats()
+    if not pipeline.running:
+        st.error((stats["last_error"] or "The ingestion pipeline stopped.") + " Press Start live feed to restart it.")
+        return
+
+    col_received, col_predicted, col_rejected, col_suspect, col_queue = st.columns(5)
+    col_received.metric("Received", f"{stats['received']:,}")
+    col_predicted.metric("Predicted", f"{stats['predicted']:,}")
+    col_rejected.metric("Rejected", f"{stats['rejected']:,}")
+    col_suspect.metric("Suspect", f"{stats['suspect']:,}", help="Held back by the sensor-fault checks in quality.py")
+    col_queue.metric("Queue", f"{stats['queue_depth']:,} / {stats['queue_max']:,}")
+    st.caption(
+        f"{stats['stations']:,} stations, {stats['batches']:,} batches, "
+        f"waited {stats['backpressure_seconds']:.2f}s on a full queue (high water {stats['queue_high_water']:,})"
+        + (f" — last rejection: {stats['last_error']}" if stats["last_error"] else "")
+    )
+    if stats["last_suspect"]:
+        suspect_station, suspect_time, suspect_flags = stats["last_suspect"]
+        st.caption(f"Last suspect reading: {suspect_station} at {suspect_time} ({suspect_flags})")
+
+    latest = pipeline.latest()
+    if not latest:
+        st.info("Waiting for readings...")
+        return
+    station = st.selectbox("Station", list(reversed(latest)), key="live_station")
+    result = latest[station]
+    category, color, css_class, glow_class = aqi_index.category_info(result["aqi"])
+    st.markdown(
+        f"<div class='prediction-result'><h3 class='{css_class}'>{station}: AQI {result['aqi']:.2f}<br>"
+        f"Category: {category}</h3></div>",
+        unsafe_allow_html=True,
+    )
+    if result["time"]:
+        st.caption(f"Reading time: {result['time']}")
+    with metrics.span("render_gauge"):
+        components.html(gauge.meter_html(result["aqi"], color, glow_class), height=350)
+    recent = [item["aqi"] for item in pipeline.recent() if item["station"] == station]
+    if len(recent) > 1:
+        st.line_chart({"AQI": recent}, y_label="AQI")
+
+@st.fragment
+@profiled
+def live_feed_section():
+    st.markdown("### 📡 Live Sensor Feed")
+    st.markdown(
+        "Follow a JSONL file or TCP socket of station readings; readings are validated and predicted in batches. "
+        "Simulate a feed with `python ingest.py replay Bangalore_AQI_Dataset.csv --rate 10`."
+    )
+    col_path, col_port = st.columns(2)
+    feed_path = col_path.text_input("JSONL feed to follow", value=os.environ.get("AQI_FEED_JSONL", ingest.DEFAULT_FEED))
+    feed_port = col_port.number_input("TCP port (0 = off)", min_value=0, max_value=65535,
+                                      value=int(os.environ.get("AQI_FEED_PORT", 0)))
+    if st.button("▶ Start live feed"):
+        if not feed_path.strip() and not feed_port:
+            st.warning("Please enter a feed file or a TCP port.")
+        else:
+            st.session_state["live_feed"] = (feed_path.strip(), int(feed_port))
+    if "live_feed" in st.session_state:
+        live_gauge(get_ingestion(*st.session_state["live_feed"]))
+
+live_feed_section()
+
+# Forecast
+@st.cache_resource
+def get_forecaster():
+    """Loads forecast.json, training it from the dataset on first use. Shared by all sessions."""
+    try:
+        forecaster = forecast.Forecaster.load(forecast.DEFAULT_MODEL)
+    except (FileNotFoundError, ValueError):
+        forecaster = forecast.fit_csv("Bangalore_AQI_Dataset.csv")
+        forecaster.save(forecast.DEFAULT_MODEL)
+    return forecaster, threading.Lock()
 
-                        <text x="70" y="250" fill="#00FF00" font-size="1em" font-family="Orbitron, sans-serif" text-anchor="middle">0</text>
-                        <text x="430" y="250" fill="#8B0000" font-size="1em" font-family="Orbitron, sans-serif" text-anchor="middle">500+</text>
+@st.cache_resource
+def get_history_store():
+    """Opens the columnar history store, converting the dataset into it on first use."""
+    if not os.path.exists(os.path.join(history.DEFAULT_STORE, "manifest.json")):
+        history.convert("Bangalore_AQI_Dataset.csv", history.DEFAULT_STORE)
+    return history.HistoryStore(history.DEFAULT_STORE)
 
-                    </svg>
-                </div>
-            """, height=350)
+@st.cache_resource
+def get_rollups():
+    """Monthly/seasonal/yearly rollups, built from the history store once and then kept up to date."""
+    return rollups.open_rollups(get_history_store(), rollups.DEFAULT_PATH)
+
+# Charts below are fixed Vega-Lite specs over cached data: st.line_chart/st.bar_chart rebuild
+# and schema-validate an Altair chart on every run (~150 ms each), a spec costs about 1 ms
+def line_spec(x_field, x_type, y_title, series=False):
+    """Line chart of the "value" column; ``series`` colours one line per "series" value."""
+    encoding = {
+        "x": {"field": x_field, "type": x_type, "title": None},
+        "y": {"field": "value", "type": "quantitative", "title": y_title},
+    }
+    if x_type == "ordinal":
+        encoding["x"]["sort"] = None  # keep the data's order
+    if series:
+        encoding["color"] = {"field": "series", "type": "nominal", "title": None}
+    return {"mark": {"type": "line", "tooltip": True}, "encoding": encoding}
+
+def category_bar_spec(x_field):
+    """Stacked days per AQI category, in the category colours."""
+    return {
+        "mark": {"type": "bar", "tooltip": True},
+        "encoding": {
+            "x": {"field": x_field, "type": "ordinal", "sort": None, "title": None},
+            "y": {"field": "days", "type": "quantitative", "stack": "zero", "title": "Days"},
+            "color": {"field": "category", "type": "nominal", "sort": rollups.CATEGORIES, "title": None,
+                      "scale": {"domain": rollups.CATEGORIES,
+                                "range": [str(color) for color in aqi_index.CATEGORY_COLORS]}},
+        },
+    }
+
+@st.cache_data(max_entries=32)
+def forecast_table(_forecaster, horizon, last_date):
+    """The forecast for ``horizon`` days; ``last_date`` keys the cache, since appending a day moves it."""
+    predictions = _forecaster.forecast(horizon)
+    values = [round(value, 1) for _, value in predictions]
+    return pd.DataFrame({
+        "Date": [f"{day:%a %d %b %Y}" for day, _ in predictions],
+        "Forecast AQI": values,
+        "Category": list(aqi_index.categorize([value for _, value in predictions])),
+    })
+
+@st.cache_data(max_entries=64)
+def history_chart_data(city, station, start, end, columns):
+    """One selection's readings in long form (time, series, value), per-column means, row count and query time."""
+    begin = time.perf_counter()
+    result = get_history_store().query(city, start, end, list(columns), station)
+    elapsed_ms = (time.perf_counter() - begin) * 1000
+    frame = pd.DataFrame({column: result[column] for column in columns}, index=pd.Index(result["time"], name="time"))
+    with np.errstate(invalid='ignore'):
+        means = {column: float(np.nanmean(result[column])) if len(frame) else float("nan") for column in columns}
+    long = frame.reset_index().melt("time", var_name="series", value_name="value")
+    return long, means, len(frame), elapsed_ms
+
+@st.cache_data(max_entries=64)
+def trend_chart_data(city, grain, version):
+    """One city's rollup table and its category days in long form; ``version`` (the city's last day) keys the cache."""
+    table = get_rollups().table(city, grain)
+    days = (table[rollups.CATEGORIES].rename_axis(grain).reset_index()
+            .melt(grain, var_name="category", value_name="days"))
+    return table, days
+
+def add_day_to_rollups(day, aqi, readings):
+    """Folds an appended day into the trend rollups; only its month, season and year change."""
+    values = dict(zip(forecast.FEATURES, readings), AQI=aqi)
+    try:
+        city_rollups = get_rollups()
+        # The forecaster is trained on the Bangalore dataset
+        city_rollups.append("Bangalore", np.datetime64(day, 's'), [[values[column] for column in rollups.COLUMNS]])
+        city_rollups.save(rollups.DEFAULT_PATH)
+    except ValueError:
+        pass  # The rollups already cover this day
+    except Exception as e:
+        st.warning(f"Trend rollups were not updated: {e}")
 
-        except Exception as e:
-            st.error(f"An error occurred during prediction: {e}. Please ensure all inputs are valid numbers.")
+@st.fragment
+@profiled
+def forecast_section():
+    st.markdown("### 📅 AQI Forecast")
+    try:
+        forecaster, forecaster_lock = get_forecaster()
+    except Exception as e:
+        st.error(f"Forecasting is unavailable: {e}")
+        return
+
+    horizon = st.slider("Days ahead", min_value=1, max_value=forecast.HORIZONS, value=forecast.HORIZONS)
+
+    with st.expander("➕ Append a day's reading"):
+        with st.form("append_reading"):
+            next_day = forecaster.state.last_date + timedelta(days=1)
+            reading_date = st.date_input("Date", value=next_day, min_value=next_day)
+            reading_aqi = st.number_input("Recorded AQI", min_value=0.0, key="append_aqi")
+            reading_cols = st.columns(3)
+            readings = [
+                reading_cols[i % 3].number_input(name, min_value=0.0, key=f"append_{name}")
+                for i, name in enumerate(forecast.FEATURES)
+            ]
+            if st.form_submit_button("Append & re-forecast"):
+                try:
+                    with forecaster_lock:
+                        forecaster.append(reading_date, reading_aqi, readings)
+                        forecaster.save(forecast.DEFAULT_MODEL)
+                    add_day_to_rollups(reading_date, reading_aqi, readings)
+                    st.success(f"Added reading for {reading_date:%d %b %Y}.")
+                except ValueError as e:
+                    st.error(f"Could not append reading: {e}")
+
+    with forecaster_lock:
+        last_date = forecaster.state.last_date
+        table = forecast_table(forecaster, horizon, last_date)
+
+    st.caption(f"History up to {last_date:%A, %d %B %Y}")
+    st.vega_lite_chart(table.rename(columns={"Forecast AQI": "value"}), line_spec("Date", "ordinal", "AQI"))
+    st.dataframe(table, hide_index=True)
+
+forecast_section()
+
+# Historical Explorer
+@st.fragment
+@profiled
+def history_section():
+    st.markdown("### 🗂 Historical Explorer")
+    try:
+        store = get_history_store()
+    except Exception as e:
+        st.error(f"Historical data is unavailable: {e}")
+        return
+
+    cities = store.cities()
+    if not cities:
+        st.info("The history store is empty.")
+        return
+    city = st.selectbox("City", cities, key="history_city")
+    stations = store.stations(city)
+    station = st.selectbox("Station", stations, key="history_station") if len(stations) > 1 else None
+    first, last = (value.astype(datetime).date() for value in store.date_range(city, station))
+    col_range, col_columns = st.columns(2)
+    date_range = col_range.date_input(
+        "Date range", value=(max(first, last - timedelta(days=30)), last), min_value=first, max_value=last,
+    )
+    columns = col_columns.multiselect("Columns", store.columns, default=["PM2.5", "AQI"])
+    if not columns or len(date_range) != 2:
+        return
+
+    readings, means, count, elapsed_ms = history_chart_data(city, station, date_range[0], date_range[1],
+                                                            tuple(columns))
+    st.caption(f"{count:,} readings, queried in {elapsed_ms:.1f} ms")
+    if count:
+        st.vega_lite_chart(readings, line_spec("time", "temporal", None, series=True))
+        metric_cols = st.columns(len(columns))
+        for metric_col, column in zip(metric_cols, columns):
+            metric_col.metric(f"Mean {column}", f"{means[column]:.1f}")
+
+    st.markdown("#### Long-range trends")
+    try:
+        city_rollups = get_rollups()
+    except Exception as e:
+        st.error(f"Trend rollups are unavailable: {e}")
+        return
+    col_grain, col_trend = st.columns(2)
+    grain = col_grain.radio("Group by", rollups.GRAINS, horizontal=True, format_func=str.capitalize,
+                            key="rollup_grain")
+    trend_column = col_trend.selectbox("Trend of", rollups.COLUMNS, key="rollup_column")
+    start = time.perf_counter()
+    with metrics.span("rollup_table"):
+        table, category_days = trend_chart_data(city, grain, city_rollups.cities.get(city, {}).get("last"))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(table)} {grain} buckets covering {table['days'].sum():,} days in {elapsed_ms:.1f} ms "
+               "(precomputed rollups)")
+    trend = table[trend_column].round(1).rename("value").reset_index()
+    st.vega_lite_chart(trend, line_spec(grain, "ordinal", f"Mean {trend_column}"))
+    st.vega_lite_chart(category_days, category_bar_spec(grain))
+
+history_section()
+
+# Admin view of the shared prediction cache
+# Controls that affect every session need this token; without one they stay hidden
+ADMIN_TOKEN = os.environ.get("AQI_ADMIN_TOKEN", "")
+
+def admin_unlocked():
+    """True once this session has entered AQI_ADMIN_TOKEN in the admin panel."""
+    entered = st.session_state.get("admin_token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(entered.encode(), ADMIN_TOKEN.encode())
+
+@st.fragment
+@profiled
+def cache_admin():
+    st.markdown("### 🛠 Admin")
+    stats = prediction_cache.stats()
+    st.metric("Prediction cache hit rate", f"{stats['hit_rate']:.1%}")
+    col_hits, col_misses = st.columns(2)
+    col_hits.metric("Hits", stats["hits"])
+    col_misses.metric("Misses", stats["misses"])
+    st.caption(
+        f"{stats['size']:,} / {stats['maxsize']:,} entries, {stats['evictions']:,} evictions, "
+        f"{stats['invalidations']} model file changes, {stats['version_changes']} location model changes"
+    )
+    models = model_registry.stats()
+    st.caption(
+        f"Models loaded: {', '.join(models['loaded']) or 'none'} "
+        f"({models['loaded_bytes'] / 1024:,.0f} KiB of {models['max_bytes'] / 1024 / 1024:,.0f} MiB), "
+        f"{models['loads']} loads, {models['evictions']} evictions"
+    )
+    st.button("Refresh", key="cache_refresh")
+    if not ADMIN_TOKEN:
+        st.caption("Set AQI_ADMIN_TOKEN to enable the admin controls.")
+        return
+    st.text_input("Admin token", type="password", key="admin_token")
+    if admin_unlocked():
+        # Clears before the fragment reruns, so the statistics above are already fresh
+        st.button("Clear cache", key="cache_clear", on_click=prediction_cache.clear)
+    elif st.session_state.get("admin_token"):
+        st.error("Wrong admin token.")
+
+with st.sidebar:
+    cache_admin()
+
+# Debug panel: stage timings from metrics.py and the opt-in per-session profiler
+@st.fragment
+@profiled
+def debug_panel():
+    with st.expander("⏱ Debug: stage timings"):
+        snapshot = metrics.REGISTRY.snapshot()
+        if snapshot:
+            st.dataframe(
+                {stage: {key: round(value, 2) for key, value in summary.items()} for stage, summary in snapshot.items()}
+            )
+        else:
+            st.caption("No stages timed yet.")
+        if metrics_server is not None:
+            host, port = metrics_server.server_address[:2]
+            st.caption(f"Prometheus endpoint: http://{host}:{port}/metrics")
+        st.button("Refresh", key="metrics_refresh")
+
+        st.toggle("Profile this session", key="profile_session",
+                  help="Samples this session's call stacks every 5 ms; only your session is affected.")
+        samples = st.session_state.get("profile_samples")
+        if samples:
+            profile = metrics.SamplingProfiler()
+            profile.samples = samples
+            profile.total = sum(samples.values())
+            st.caption(f"{profile.total:,} samples")
+            top = profile.top()
+            st.dataframe(
+                {"Function": [name for name, _ in top], "Share": [f"{share:.1%}" for _, share in top]},
+                hide_index=True,
+            )
+            st.download_button("⬇ Collapsed stacks", data=profile.collapsed(), file_name="aqi_profile.txt",
+                               mime="text/plain")
+            if st.button("Reset profile", key="profile_reset"):
+                del st.session_state["profile_samples"]
+                st.rerun(scope="fragment")
+
+with st.sidebar:
+    debug_panel()
 
 st.markdown("---")
 st.markdown(
@@ -523,4 +1110,7 @@ st.markdown(
     "Developed by JINU,SANJAY AND ABHIRAM."
     "</div>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+stop_session_profiler(script_profiler)
+metrics.REGISTRY.observe("script_run", time.perf_counter() - _run_start)
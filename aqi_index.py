@@ -0,0 +1,142 @@
+"""Deterministic AQI from the CPCB breakpoint tables, vectorized over NumPy arrays.
+
+Every pollutant concentration is mapped to a sub-index by locating its
+breakpoint band with ``np.searchsorted`` and interpolating linearly inside the
+band; the overall AQI is the highest sub-index. Concentrations use the
+dataset's units (µg/m³, CO in mg/m³), which match India's National AQI.
+
+The same sorted-array lookup maps an AQI value to the category, colour and CSS
+classes shown in the app.
+
+Usage:
+    python aqi_index.py [Bangalore_AQI_Dataset.csv] [--model li.json]
+"""
+import argparse
+
+import numpy as np
+
+import engine
+
+FEATURES = engine.FEATURES
+
+# Sub-index at each band edge: Good, Satisfactory, Moderate, Poor, Very Poor, Severe
+INDEX_BREAKPOINTS = np.array([0, 50, 100, 200, 300, 400, 500], dtype=float)
+
+# Concentration at each band edge, in FEATURES order. The last edge only sets the
+# slope of the Severe band; higher concentrations are extrapolated along it.
+CONCENTRATION_BREAKPOINTS = np.array([
+    [0, 30, 60, 90, 120, 250, 380],         # PM2.5 (24h, µg/m³)
+    [0, 50, 100, 250, 350, 430, 510],       # PM10 (24h, µg/m³)
+    [0, 40, 80, 180, 280, 400, 520],        # NO2 (24h, µg/m³)
+    [0, 40, 80, 380, 800, 1600, 2400],      # SO2 (24h, µg/m³)
+    [0, 1.0, 2.0, 10, 17, 34, 51],          # CO (8h, mg/m³)
+    [0, 50, 100, 168, 208, 748, 1000],      # O3 (8h, µg/m³)
+], dtype=float)
+
+# App categories: upper AQI edge of each band, then the shared lookup columns
+CATEGORY_UPPER_BOUNDS = np.array([50, 100, 150, 200, 300, np.inf])
+CATEGORY_NAMES = np.array([
+    "Good", "Moderate", "Unhealthy for Sensitive Groups", "Unhealthy", "Very Unhealthy", "Hazardous", "No Data",
+])
+CATEGORY_LABELS = np.array([
+    "Good ✅", "Moderate 🌤", "Unhealthy for Sensitive Groups ⚠", "Unhealthy 🛑", "Very Unhealthy ☣", "Hazardous ☠",
+    "No Data / Extreme Value 💼",
+])
+CATEGORY_COLORS = np.array(["#00FF00", "#ADFF2F", "#FFA500", "#FF4500", "#FF1493", "#8B0000", "#FFFFFF"])
+CATEGORY_CSS = np.array([
+    "aqi-good", "aqi-moderate", "aqi-sensitive", "aqi-unhealthy", "aqi-very-unhealthy", "aqi-hazardous", "aqi-no-data",
+])
+CATEGORY_GLOW = np.array([
+    "glow-good", "glow-moderate", "glow-sensitive", "glow-unhealthy", "glow-very-unhealthy", "glow-hazardous", "",
+])
+NO_DATA = len(CATEGORY_NAMES) - 1
+
+
+def category_index(aqi):
+    """Returns the category row for every AQI value (NO_DATA for negative or missing values)."""
+    aqi = np.atleast_1d(np.asarray(aqi, dtype=float))
+    idx = np.searchsorted(CATEGORY_UPPER_BOUNDS, aqi, side='left')
+    idx[(aqi < 0) | np.isnan(aqi)] = NO_DATA
+    return idx
+
+
+def categorize(aqi):
+    """Returns the category name for every AQI value."""
+    return CATEGORY_NAMES[category_index(aqi)]
+
+
+def category_info(aqi):
+    """Returns (label, color, css_class, glow_class) for a single AQI value."""
+    i = category_index(aqi)[0]
+    return str(CATEGORY_LABELS[i]), str(CATEGORY_COLORS[i]), str(CATEGORY_CSS[i]), str(CATEGORY_GLOW[i])
+
+
+def sub_indices(concentrations):
+    """Returns the sub-index of each pollutant for an (n, 6) array in FEATURES order.
+
+    Negative or missing concentrations give NaN.
+    """
+    conc = np.asarray(concentrations, dtype=float)
+    conc = conc.reshape(-1, len(FEATURES))
+    result = np.empty_like(conc)
+    last_band = len(INDEX_BREAKPOINTS) - 2
+    for j, edges in enumerate(CONCENTRATION_BREAKPOINTS):
+        column = conc[:, j]
+        band = np.clip(np.searchsorted(edges, column, side='left') - 1, 0, last_band)
+        c_lo, c_hi = edges[band], edges[band + 1]
+        i_lo, i_hi = INDEX_BREAKPOINTS[band], INDEX_BREAKPOINTS[band + 1]
+        result[:, j] = i_lo + (column - c_lo) * (i_hi - i_lo) / (c_hi - c_lo)
+    result[~(conc >= 0)] = np.nan
+    return result
+
+
+def compute_aqi(concentrations):
+    """Returns (aqi, dominant_pollutant_index) for an (n, 6) array in FEATURES order."""
+    indices = sub_indices(concentrations)
+    filled = np.where(np.isnan(indices), -np.inf, indices)
+    dominant = filled.argmax(axis=1)
+    aqi = filled[np.arange(len(filled)), dominant]
+    aqi[np.isinf(aqi)] = np.nan
+    return aqi, dominant
+
+
+def drift(model, concentrations):
+    """Summarises how far model predictions are from the breakpoint formula."""
+    conc = np.asarray(concentrations, dtype=float).reshape(-1, len(FEATURES))
+    formula, _ = compute_aqi(conc)
+    diff = np.asarray(model.predict(conc), dtype=float) - formula
+    diff = diff[~np.isnan(diff)]
+    if not len(diff):
+        return {"rows": 0}
+    return {
+        "rows": int(len(diff)),
+        "mean": float(diff.mean()),
+        "mean_abs": float(np.abs(diff).mean()),
+        "p95_abs": float(np.percentile(np.abs(diff), 95)),
+        "max_abs": float(np.abs(diff).max()),
+    }
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Compare model predictions with the CPCB AQI formula.")
+    parser.add_argument("data", nargs="?", default="Bangalore_AQI_Dataset.csv")
+    parser.add_argument("--model", default=engine.DEFAULT_ARTIFACT,
+                        help="Model artifact or pickle (default: li.json, falling back to li.pkl)")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data, encoding='utf-8-sig')
+    conc = data[FEATURES].to_numpy(dtype=float)
+    stats = drift(engine.load_model(args.model), conc)
+    print(f"Model vs formula over {stats['rows']} rows: mean {stats.get('mean', 0):+.2f}, "
+          f"mean |diff| {stats.get('mean_abs', 0):.2f}, p95 {stats.get('p95_abs', 0):.2f}, "
+          f"max {stats.get('max_abs', 0):.2f}")
+    if 'AQI' in data.columns:
+        formula, _ = compute_aqi(conc)
+        diff = np.abs(data['AQI'].to_numpy(dtype=float) - formula)
+        print(f"Recorded AQI vs formula: mean |diff| {np.nanmean(diff):.2f}, max {np.nanmax(diff):.2f}")
+
+
+if __name__ == "__main__":
+    main()
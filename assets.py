@@ -0,0 +1,191 @@
+"""Self-hosted static assets (fonts, tree image, ambience audio).
+
+The page used to pull Google Fonts, imgur images and a SoundHelix MP3 from
+external hosts on every render, which slowed first paint and broke on
+air-gapped deployments. Assets now live in ``static/`` and are served by
+Streamlit's static file serving (``.streamlit/config.toml``) at ``app/static/``,
+or by ``python assets.py serve`` with long-lived caching headers when
+``AQI_ASSET_BASE_URL`` points at it.
+
+Roboto (Latin subset) and the tree image are bundled. Orbitron and the
+ambience MP3 are not; ``python assets.py fetch`` downloads them into static/
+on a connected machine. Until then the page falls back to
+system fonts and the ambience toggle stays unavailable.
+
+Usage:
+    python assets.py fetch
+    python assets.py serve [--port 8601] [--max-age 31536000]
+    python assets.py measure [--base-url http://localhost:8501/app/static]
+"""
+import argparse
+import functools
+import os
+import re
+import time
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DEFAULT_BASE_URL = "app/static"
+
+TREE_IMAGE = "tree.svg"
+AMBIENCE_AUDIO = "forest-ambience.mp3"
+ORBITRON_FONT = "fonts/Orbitron.woff2"
+
+# Where the page used to load each asset from, for `fetch` and `measure`
+EXTERNAL_SOURCES = {
+    ORBITRON_FONT: "https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&display=swap",
+    AMBIENCE_AUDIO: "https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3",
+    "tree.png": "https://i.imgur.com/gK5WfC0.png",
+    "fonts.css": "https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&family=Roboto:wght@300;400;700&display=swap",
+}
+PAGE_ASSETS = ["fonts/Roboto-Light.woff2", "fonts/Roboto-Regular.woff2", "fonts/Roboto-Bold.woff2",
+               ORBITRON_FONT, TREE_IMAGE]
+
+# Google Fonts only returns woff2 to browsers it recognises
+BROWSER_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+def base_url():
+    return os.environ.get("AQI_ASSET_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def asset_url(name):
+    """URL the browser should load a static asset from."""
+    return f"{base_url()}/{name}"
+
+
+def available(name):
+    """Whether an asset is present in static/."""
+    return os.path.exists(os.path.join(STATIC_DIR, name))
+
+
+def font_face_css():
+    """@font-face rules for the self-hosted fonts (replaces the Google Fonts @import)."""
+    rules = []
+    for weight, style in ((300, "Light"), (400, "Regular"), (700, "Bold")):
+        rules.append(
+            f"@font-face {{ font-family: 'Roboto'; font-style: normal; font-weight: {weight}; font-display: swap; "
+            f"src: local('Roboto {style}'), local('Roboto-{style}'), "
+            f"url('{asset_url(f'fonts/Roboto-{style}.woff2')}') format('woff2'); }}"
+        )
+    orbitron_sources = ["local('Orbitron')"]
+    if available(ORBITRON_FONT):
+        orbitron_sources.append(f"url('{asset_url(ORBITRON_FONT)}') format('woff2')")
+    rules.append(
+        "@font-face { font-family: 'Orbitron'; font-style: normal; font-weight: 400 900; font-display: swap; "
+        f"src: {', '.join(orbitron_sources)}; }}"
+    )
+    return "\n        ".join(rules)
+
+
+def _download(url, path, timeout=30):
+    request = urllib.request.Request(url, headers={"User-Agent": BROWSER_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read()
+    if path is None:
+        return data
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+def fetch():
+    """Downloads the assets that aren't bundled into static/."""
+    css = _download(EXTERNAL_SOURCES[ORBITRON_FONT], None).decode()
+    # The last block in Google's CSS is the basic Latin subset
+    urls = re.findall(r"url\((https://[^)]+\.woff2)\)", css)
+    if not urls:
+        raise RuntimeError("Could not find the Orbitron font file in the Google Fonts response")
+    _download(urls[-1], os.path.join(STATIC_DIR, ORBITRON_FONT))
+    print(f"Fetched {ORBITRON_FONT}")
+    _download(EXTERNAL_SOURCES[AMBIENCE_AUDIO], os.path.join(STATIC_DIR, AMBIENCE_AUDIO), timeout=120)
+    print(f"Fetched {AMBIENCE_AUDIO}")
+
+
+class CachingStaticHandler(SimpleHTTPRequestHandler):
+    """Serves static/ with Cache-Control on top of the stdlib Last-Modified/304 handling."""
+
+    max_age = 31_536_000
+
+    def end_headers(self):
+        self.send_header("Cache-Control", f"public, max-age={self.max_age}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8601, max_age=CachingStaticHandler.max_age):
+    handler = type("Handler", (CachingStaticHandler,), {"max_age": max_age})
+    server = ThreadingHTTPServer((host, port), functools.partial(handler, directory=STATIC_DIR))
+    print(f"Serving {STATIC_DIR} on http://{host}:{port} (Cache-Control max-age={max_age}); "
+          f"set AQI_ASSET_BASE_URL=http://{host}:{port} for the app")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _time_fetch(url, timeout):
+    start = time.perf_counter()
+    try:
+        _download(url, None, timeout=timeout)
+        status = "ok"
+    except Exception as e:
+        status = f"failed ({type(e).__name__})"
+    return time.perf_counter() - start, status
+
+
+def measure(local_base, timeout=10):
+    """Times fetching the page's render-blocking assets locally vs from the original hosts."""
+    print(f"Self-hosted ({local_base}):")
+    total = 0.0
+    for name in PAGE_ASSETS:
+        if not available(name):
+            print(f"  {name:<30} not fetched, page falls back to system fonts")
+            continue
+        seconds, status = _time_fetch(f"{local_base.rstrip('/')}/{name}", timeout)
+        total += seconds
+        print(f"  {name:<30} {seconds * 1000:8.1f} ms  {status}")
+    print(f"  total {total * 1000:.1f} ms")
+    print("External hosts (previous behaviour):")
+    total = 0.0
+    for name, url in EXTERNAL_SOURCES.items():
+        if name == ORBITRON_FONT:
+            continue
+        seconds, status = _time_fetch(url, timeout)
+        total += seconds
+        print(f"  {name:<30} {seconds * 1000:8.1f} ms  {status}")
+    print(f"  total {total * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the app's self-hosted static assets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("fetch", help="Download Orbitron and the ambience MP3 into static/")
+    serve_cmd = sub.add_parser("serve", help="Serve static/ with long-lived caching headers")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8601)
+    serve_cmd.add_argument("--max-age", type=int, default=CachingStaticHandler.max_age)
+    measure_cmd = sub.add_parser("measure", help="Time asset loading, self-hosted vs external")
+    measure_cmd.add_argument("--base-url", default="http://localhost:8501/app/static")
+    measure_cmd.add_argument("--timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.command == "fetch":
+        fetch()
+    elif args.command == "serve":
+        serve(args.host, args.port, args.max_age)
+    else:
+        measure(args.base_url, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Batch AQI prediction over whole station exports.
+
+Reads CSV files with the same schema as Bangalore_AQI_Dataset.csv in
+bounded-memory chunks, scores each chunk with one vectorized ``predict``
+call and streams the results (with an AQI category per row) to an output CSV.
+
+Usage:
+    python batch.py input.csv output.csv [--model li.json] [--chunksize 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import aqi_index
+import engine
+
+FEATURES = engine.FEATURES
+DEFAULT_CHUNKSIZE = 100_000
+
+def iter_predictions(classifier, source, chunksize=DEFAULT_CHUNKSIZE):
+    """Yields each chunk of ``source`` with 'Predicted_AQI' and 'AQI_Category' columns added."""
+    reader = pd.read_csv(source, chunksize=chunksize, encoding='utf-8-sig')
+    for chunk in reader:
+        missing = [name for name in FEATURES if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing pollutant columns: {', '.join(missing)}")
+        features = chunk[FEATURES].apply(pd.to_numeric, errors='coerce')
+        valid = features.notna().all(axis=1).to_numpy()
+        predicted = np.full(len(chunk), np.nan)
+        if valid.any():
+            predicted[valid] = classifier.predict(features[valid])
+        chunk['Predicted_AQI'] = predicted.round(2)
+        chunk['AQI_Category'] = aqi_index.categorize(predicted)
+        yield chunk
+
+
+def predict_file(classifier, source, output, chunksize=DEFAULT_CHUNKSIZE, progress=None, last_by=None):
+    """Scores ``source`` into the CSV ``output`` and returns throughput stats.
+
+    ``progress`` is an optional callback receiving the number of rows done so far.
+    With ``last_by`` (e.g. 'City') the stats also carry "latest": {station:
+    predicted AQI of its last row}, collected while streaming so the output
+    never has to be read back (None if the input has no such column).
+    """
+    rows = 0
+    latest = {} if last_by else None
+    start = time.perf_counter()
+    for i, chunk in enumerate(iter_predictions(classifier, source, chunksize)):
+        chunk.to_csv(output, index=False, header=(i == 0))
+        rows += len(chunk)
+        if latest is not None:
+            if last_by in chunk.columns:
+                last = chunk.drop_duplicates(last_by, keep='last')
+                latest.update(zip(last[last_by].tolist(), last['Predicted_AQI'].tolist()))
+            else:
+                latest = None
+        if progress is not None:
+            progress(rows)
+    seconds = time.perf_counter() - start
+    stats = {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+    }
+    if last_by:
+        stats["latest"] = latest
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict AQI for every row of a station export.")
+    parser.add_argument("input", help="CSV file with PM2.5, PM10, NO2, SO2, CO and O3 columns")
+    parser.add_argument("output", help="CSV file to write predictions to")
+    parser.add_argument("--model", default=engine.DEFAULT_ARTIFACT,
+                        help="Model artifact or pickle (default: li.json, falling back to li.pkl)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"Rows per chunk (default: {DEFAULT_CHUNKSIZE})")
+    args = parser.parse_args()
+
+    classifier = engine.load_model(args.model)
+
+    with open(args.output, 'w', newline='') as out:
+        stats = predict_file(classifier, args.input, out, args.chunksize)
+    print(f"Scored {stats['rows']} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Micro-benchmarks for the prediction and rendering hot paths.
+
+Runs offline against li.json / li.pkl and synthetic rows shaped like
+Bangalore_AQI_Dataset.csv, and writes machine-readable results so runs from
+different commits can be compared.
+
+Usage:
+    python bench.py [--quick] [--out bench_results/<commit>.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+import aqi_index
+import engine
+import gauge
+
+FEATURES = engine.FEATURES
+BATCH_SIZES = [1, 1_000, 100_000, 1_000_000]
+
+COLD_LOAD_SNIPPETS = {
+    "artifact": "import engine; engine.load_model('li.json', fallback=None)",
+    "pickle": "import engine; engine.load_pickle('li.pkl')",
+}
+
+
+def synthetic_rows(n, data_path="Bangalore_AQI_Dataset.csv", seed=0):
+    """Random pollutant rows with the per-column mean/std of the dataset (or fixed defaults)."""
+    rng = np.random.default_rng(seed)
+    try:
+        import pandas as pd
+        data = pd.read_csv(data_path, encoding='utf-8-sig')[FEATURES]
+        mean, std = data.mean().to_numpy(), data.std().to_numpy()
+    except (ImportError, FileNotFoundError, KeyError):
+        mean = np.array([60.0, 120.0, 60.0, 50.0, 1.2, 60.0])
+        std = np.array([25.0, 45.0, 20.0, 20.0, 0.5, 20.0])
+    return np.abs(rng.normal(mean, std, size=(n, len(FEATURES))))
+
+
+def time_call(fn, repeat=5, min_time=0.2):
+    """Returns the best per-call time in seconds, auto-scaling the loop count like timeit."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def bench_cold_load(repeat):
+    """Model load time in a fresh interpreter, so imports are included."""
+    results = {}
+    for name, snippet in COLD_LOAD_SNIPPETS.items():
+        code = (
+            "import time, warnings; warnings.simplefilter('ignore'); t = time.perf_counter(); "
+            f"{snippet}; print(time.perf_counter() - t)"
+        )
+        samples = []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+            if proc.returncode != 0:
+                break
+            samples.append(float(proc.stdout.strip().splitlines()[-1]))
+        if samples:
+            results[f"cold_load.{name}"] = {"seconds": min(samples)}
+    return results
+
+
+def load_models():
+    """The models to benchmark: the NumPy engine and, if sklearn is installed, the pickle."""
+    models = {"artifact": engine.load_model(engine.DEFAULT_ARTIFACT)}
+    try:
+        models["pickle"] = engine.load_pickle(engine.DEFAULT_PICKLE)
+    except (ImportError, FileNotFoundError):
+        pass
+    return models
+
+
+def bench_predict(models, batch_sizes):
+    results = {}
+    rows = synthetic_rows(max(batch_sizes))
+    single = [list(rows[0])]
+    for name, model in models.items():
+        results[f"predict_single.{name}"] = {"seconds": time_call(lambda: model.predict(single))}
+        for n in batch_sizes:
+            X = rows[:n]
+            seconds = time_call(lambda: model.predict(X), repeat=3)
+            results[f"predict_batch.{name}.{n}"] = {"seconds": seconds, "rows_per_sec": n / seconds}
+    return results
+
+
+def bench_forest(batch_sizes, n_estimators=100, max_rows=100_000):
+    """sklearn vs the engine's flattened evaluator for a random forest fitted on the dataset."""
+    try:
+        import pandas as pd
+        from sklearn.ensemble import RandomForestRegressor
+        data = pd.read_csv("Bangalore_AQI_Dataset.csv", encoding='utf-8-sig').dropna(subset=FEATURES + ['AQI'])
+    except (ImportError, FileNotFoundError):
+        return {}
+    forest = RandomForestRegressor(n_estimators=n_estimators, random_state=0)
+    forest.fit(data[FEATURES].to_numpy(), data['AQI'].to_numpy())
+    models = {"sklearn": forest, "engine": engine.TreeEnsemble.from_estimator(forest)}
+    rows = synthetic_rows(max(batch_sizes))
+    results = {}
+    for name, model in models.items():
+        results[f"forest_single.{name}"] = {"seconds": time_call(lambda: model.predict(rows[:1]))}
+        for n in batch_sizes:
+            if n > max_rows:
+                continue
+            X = rows[:n]
+            seconds = time_call(lambda: model.predict(X), repeat=3)
+            results[f"forest_batch.{name}.{n}"] = {"seconds": seconds, "rows_per_sec": n / seconds}
+    return results
+
+
+def bench_category(batch_sizes):
+    aqi = synthetic_rows(max(batch_sizes))[:, 0] * 3
+    results = {"category_single": {"seconds": time_call(lambda: aqi_index.category_info(123.4))}}
+    for n in batch_sizes:
+        values = aqi[:n]
+        seconds = time_call(lambda: aqi_index.categorize(values), repeat=3)
+        results[f"category_batch.{n}"] = {"seconds": seconds, "rows_per_sec": n / seconds}
+    return results
+
+
+def bench_gauge():
+    uncached = gauge.arcs_and_labels.__wrapped__
+    results = {
+        "gauge.arcs_and_labels_uncached": {"seconds": time_call(lambda: uncached("glow-moderate"))},
+        "gauge.needle": {"seconds": time_call(lambda: gauge.needle_coordinates(123.4))},
+        "gauge.meter_html": {"seconds": time_call(lambda: gauge.meter_html(123.4, "#FFA500", "glow-sensitive"))},
+    }
+    aqi = np.linspace(0, 550, 10_000)
+    stations = [f"Station {i}" for i in range(len(aqi))]
+    for name, fn in (("render_batch", lambda: gauge.render_batch(aqi)),
+                     ("bulletin", lambda: gauge.bulletin_html(stations, aqi))):
+        seconds = time_call(fn, repeat=3)
+        results[f"gauge.{name}.{len(aqi)}"] = {"seconds": seconds, "rows_per_sec": len(aqi) / seconds}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    """Prints the ratio of each benchmark's time to the same benchmark in a previous run."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)["results"]
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):")
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result["seconds"] / baseline[name]["seconds"]
+            flag = "  <-- regression" if ratio > 1.2 else ""
+            print(f"  {name:<45} {ratio:6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AQI prediction and rendering hot paths.")
+    parser.add_argument("--quick", action="store_true", help="Skip the 1M-row batch and use fewer cold starts")
+    parser.add_argument("--out", help="Results file (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    # sklearn warns on every call about unpickling and plain-array inputs
+    warnings.simplefilter("ignore")
+    batch_sizes = BATCH_SIZES[:-1] if args.quick else BATCH_SIZES
+    commit = git_commit()
+
+    results = {}
+    results.update(bench_cold_load(repeat=1 if args.quick else 3))
+    results.update(bench_predict(load_models(), batch_sizes))
+    results.update(bench_forest(batch_sizes))
+    results.update(bench_category(batch_sizes))
+    results.update(bench_gauge())
+
+    for name, result in results.items():
+        rate = f"  {result['rows_per_sec']:>14,.0f} rows/s" if "rows_per_sec" in result else ""
+        print(f"{name:<45} {result['seconds'] * 1e6:>12.1f} µs{rate}")
+
+    out = args.out or os.path.join("bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, 'w') as file:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, file, indent=2)
+    print(f"\nSaved results to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Process-wide LRU cache of AQI predictions.
+
+Sensors report at a fixed resolution, so operators and dashboards send the same
+readings over and over. Inputs are rounded to that resolution and used as the
+cache key; predictions are computed on the rounded values so every reading in a
+bucket gets the same answer. The cache empties itself when the model file
+changes on disk, and drops a namespace's entries when that namespace's model
+version changes.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import engine
+
+DEFAULT_MAXSIZE = 10_000
+# Reporting resolution per pollutant, in FEATURES order (CO is in mg/m³)
+DEFAULT_RESOLUTION = (0.1, 0.1, 0.1, 0.1, 0.01, 0.1)
+
+
+def model_signature(paths=(engine.DEFAULT_ARTIFACT, engine.DEFAULT_PICKLE)):
+    """Identifies the current model files by modification time and size."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class PredictionCache:
+    """Size-bounded LRU cache of predictions keyed on quantized pollutant readings."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, resolution=DEFAULT_RESOLUTION,
+                 model_paths=(engine.DEFAULT_ARTIFACT, engine.DEFAULT_PICKLE)):
+        self.maxsize = maxsize
+        self.resolution = np.broadcast_to(np.asarray(resolution, dtype=float), (len(engine.FEATURES),))
+        self.model_paths = tuple(model_paths)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._signature = model_signature(self.model_paths)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0  # model files changed
+        self._versions = {}  # namespace -> model version its entries came from
+        self.version_changes = 0
+
+    def quantize(self, rows):
+        """Returns (integer keys, rounded values) for an (n, 6) array of readings."""
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(engine.FEATURES))
+        steps = np.round(rows / self.resolution)
+        return steps.astype(np.int64), steps * self.resolution
+
+    def _check_model(self):
+        """Drops every entry if the model files changed. Caller holds the lock."""
+        signature = model_signature(self.model_paths)
+        if signature != self._signature:
+            self._entries.clear()
+            self._signature = signature
+            self.invalidations += 1
+
+    def _check_version(self, namespace, version):
+        """Drops the namespace's entries if its model version changed. Caller holds the lock."""
+        previous = self._versions.get(namespace, version)
+        self._versions[namespace] = version
+        if previous != version:
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+            self.version_changes += 1
+
+    def predict(self, model, rows, namespace=None, version=None):
+        """Predicts AQI for ``rows``, only calling ``model.predict`` for rows not in the cache.
+
+        ``namespace`` separates entries of different models (e.g. per-location models);
+        ``version`` identifies the namespace's current model, and a new one purges its old entries.
+        """
+        keys, rounded = self.quantize(rows)
+        keys = [(namespace,) + tuple(key) for key in keys.tolist()]
+        result = np.empty(len(keys))
+        missing = []
+        with self._lock:
+            self._check_model()
+            self._check_version(namespace, version)
+            signature = self._signature
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    result[i] = value
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predictions = np.asarray(model.predict(rounded[missing]), dtype=float)
+            result[missing] = predictions
+            with self._lock:
+                # Results of a model replaced meanwhile must not land next to the new model's
+                if self._signature != signature or self._versions.get(namespace) != version:
+                    return result
+                for i, value in zip(missing, predictions):
+                    self._entries[keys[i]] = float(value)
+                    self._entries.move_to_end(keys[i])
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version_changes": self.version_changes,
+            }
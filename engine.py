@@ -0,0 +1,320 @@
+"""sklearn-free inference for the AQI model.
+
+``li.pkl`` holds a scikit-learn ``LinearRegression``; unpickling it imports all
+of scikit-learn (and runs arbitrary pickle code) just to evaluate six
+coefficients. This module exports the coefficients, intercept and feature
+order to a small JSON artifact and evaluates it with a NumPy dot product.
+Decision trees and random forests are compiled into flat node arrays and
+evaluated for all rows and trees at once, level by level, in cache-sized
+chunks, so no batch size needs the pickle. Model types it can't export keep
+using the pickle. ``parse_row`` validates the JSON rows that ``server.py`` and
+``ingest.py`` receive.
+
+Usage:
+    python engine.py export [li.pkl] [li.json]
+"""
+import base64
+import json
+import math
+import os
+import pickle
+import sys
+
+import numpy as np
+
+FEATURES = ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3']
+DEFAULT_ARTIFACT = "li.json"
+DEFAULT_PICKLE = "li.pkl"
+
+
+def parse_row(row):
+    """Turns a JSON row (dict keyed by pollutant or list of 6 values) into floats in feature order.
+
+    Raises ValueError unless every value is finite and non-negative.
+    """
+    if isinstance(row, dict):
+        if "features" in row:
+            row = row["features"]
+        else:
+            missing = [name for name in FEATURES if name not in row]
+            if missing:
+                raise ValueError(f"Missing pollutant values: {', '.join(missing)}")
+            row = [row[name] for name in FEATURES]
+    if not isinstance(row, (list, tuple)) or len(row) != len(FEATURES):
+        raise ValueError(f"Expected {len(FEATURES)} values in the order {', '.join(FEATURES)}")
+    values = [float(value) for value in row]
+    if not all(math.isfinite(value) and value >= 0 for value in values):
+        raise ValueError("Pollutant values must be finite and non-negative")
+    return values
+
+
+class LinearModel:
+    """Linear model evaluated as ``X @ coef + intercept``."""
+
+    kind = "linear"
+
+    def __init__(self, coef, intercept, features=FEATURES, metadata=None):
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = float(intercept)
+        self.features = list(features)
+        self.metadata = dict(metadata or {})  # e.g. {"location": "Bengaluru / Peenya"}
+        if self.coef.shape != (len(self.features),):
+            raise ValueError(f"Expected {len(self.features)} coefficients, got {self.coef.shape}")
+
+    def predict(self, X):
+        """Predicts AQI for rows of pollutant concentrations in feature order."""
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        X = np.asarray(X, dtype=float)
+        return X @ self.coef + self.intercept
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Builds a LinearModel from a fitted sklearn linear estimator."""
+        coef = np.ravel(getattr(estimator, 'coef_', None))
+        if coef.dtype == object or np.ndim(getattr(estimator, 'intercept_', None)) != 0:
+            raise ValueError(f"Unsupported model type: {type(estimator).__name__}")
+        features = getattr(estimator, 'feature_names_in_', FEATURES)
+        return cls(coef, estimator.intercept_, [str(name) for name in features])
+
+    def to_dict(self):
+        data = {
+            "kind": self.kind,
+            "features": self.features,
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+        }
+        if self.metadata:
+            data["metadata"] = self.metadata
+        return data
+
+    def save(self, path):
+        """Writes the artifact atomically so readers never see a partial file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["coef"], data["intercept"], data.get("features", FEATURES), data.get("metadata"))
+
+
+def _encode_array(array):
+    array = np.ascontiguousarray(array)
+    return {"dtype": array.dtype.str, "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def _decode_array(data):
+    return np.frombuffer(base64.b64decode(data["data"]), dtype=np.dtype(data["dtype"])).copy()
+
+
+class TreeEnsemble:
+    """Regression trees (one tree or an averaged forest) compiled into contiguous node arrays.
+
+    All trees share one set of arrays; ``roots`` holds each tree's first node.
+    Nodes are renumbered so a node's right child directly follows its left
+    child, making a step ``left[node] + (x > threshold[node])`` without
+    branches. Leaves point to themselves with an infinite threshold, so every
+    (row, tree) pair takes the same vectorized step per level until all of
+    them sit on a leaf. A missing (NaN) value follows ``missing_left`` per
+    node, scikit-learn's ``missing_go_to_left``; artifacts exported before it
+    was recorded refuse rows with missing values.
+    """
+
+    kind = "tree_ensemble"
+    # (row, tree) pairs walked at once; keeps the temporary arrays cache-sized
+    CHUNK_PAIRS = 1 << 16
+
+    def __init__(self, roots, feature, threshold, left, value, max_depth, features=FEATURES, missing_left=None,
+                 metadata=None):
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=float)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.value = np.asarray(value, dtype=float)
+        self.max_depth = int(max_depth)
+        self.features = list(features)
+        self.metadata = dict(metadata or {})
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.missing_left = None if missing_left is None else np.asarray(missing_left, dtype=bool)
+        # Split nodes that send a missing value to their right child; never a leaf, which points to itself
+        self.missing_right = None if missing_left is None else ~self.missing_left & ~self.is_leaf
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        """Predicts AQI for rows of pollutant concentrations in feature order."""
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        # sklearn compares float32 inputs against float64 thresholds; do the same so splits match
+        X = np.asarray(X, dtype=np.float32).astype(float).reshape(-1, len(self.features))
+        missing = bool(np.isnan(X).any())
+        if missing and self.missing_right is None:
+            raise ValueError("This model artifact predates missing-value support; "
+                             "re-export it to predict rows with missing values")
+        result = np.empty(len(X))
+        rows_per_chunk = max(1, self.CHUNK_PAIRS // self.n_trees)
+        for start in range(0, len(X), rows_per_chunk):
+            result[start:start + rows_per_chunk] = self._predict_chunk(X[start:start + rows_per_chunk], missing)
+        return result
+
+    def _predict_chunk(self, X, missing=False):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        node = np.tile(self.roots, n_rows)
+        offset = np.repeat(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees)
+        pairs = np.arange(len(node))
+        current = node
+        for depth in range(1, self.max_depth + 1):
+            x = flat.take(self.feature.take(current) + offset)
+            right = x > self.threshold.take(current)
+            if missing:
+                right |= np.isnan(x) & self.missing_right.take(current)
+            current = self.left.take(current) + right
+            # Once most pairs sit on a leaf, keep walking only the rest
+            if depth % 4 == 0 and depth < self.max_depth:
+                walking = ~self.is_leaf.take(current)
+                if np.count_nonzero(walking) * 2 < len(current):
+                    node[pairs] = current
+                    pairs, current, offset = pairs[walking], current[walking], offset[walking]
+        node[pairs] = current
+        return self.value.take(node).reshape(n_rows, self.n_trees).mean(axis=1)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Builds a TreeEnsemble from a fitted sklearn tree regressor or forest of them."""
+        trees = [tree.tree_ for tree in getattr(estimator, 'estimators_', [])]
+        if not trees and hasattr(estimator, 'tree_'):
+            trees = [estimator.tree_]
+        if not trees or type(estimator).__name__ not in (
+                "DecisionTreeRegressor", "ExtraTreeRegressor", "RandomForestRegressor", "ExtraTreesRegressor"):
+            raise ValueError(f"Unsupported model type: {type(estimator).__name__}")
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output trees are supported")
+
+        roots, feature, threshold, left, value, missing_left = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            # Breadth-first renumbering that places each right child right after its left child
+            order = [0]
+            new_left = np.arange(tree.node_count) + offset
+            for new_id, old in enumerate(order):
+                if tree.children_left[old] != -1:
+                    new_left[new_id] = offset + len(order)
+                    order.extend((tree.children_left[old], tree.children_right[old]))
+            order = np.array(order)
+            leaf = tree.children_left[order] == -1
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature[order]))
+            threshold.append(np.where(leaf, np.inf, tree.threshold[order]))
+            left.append(new_left)
+            value.append(tree.value[order, 0, 0])
+            # scikit-learn before 1.3 has no missing-value routing and rejects NaN inputs
+            go_left = getattr(tree, 'missing_go_to_left', np.ones(tree.node_count, dtype=bool))
+            missing_left.append(leaf | np.asarray(go_left, dtype=bool)[order])
+            offset += tree.node_count
+        features = getattr(estimator, 'feature_names_in_', FEATURES)
+        return cls(roots, np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+                   np.concatenate(value), max(tree.max_depth for tree in trees),
+                   [str(name) for name in features], np.concatenate(missing_left))
+
+    def to_dict(self):
+        names = ["roots", "feature", "threshold", "left", "value"]
+        if self.missing_left is not None:
+            names.append("missing_left")
+        data = {
+            "kind": self.kind,
+            "features": self.features,
+            "max_depth": self.max_depth,
+            "arrays": {name: _encode_array(getattr(self, name)) for name in names},
+        }
+        if self.metadata:
+            data["metadata"] = self.metadata
+        return data
+
+    def save(self, path):
+        """Writes the artifact atomically so readers never see a partial file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.to_dict(), file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_dict(cls, data):
+        arrays = {name: _decode_array(array) for name, array in data["arrays"].items()}
+        return cls(max_depth=data["max_depth"], features=data.get("features", FEATURES),
+                   metadata=data.get("metadata"), **arrays)
+
+
+# Artifact kinds that can be evaluated without scikit-learn
+KINDS = {LinearModel.kind: LinearModel, TreeEnsemble.kind: TreeEnsemble}
+
+
+def load_artifact(path):
+    """Loads a JSON model artifact written by ``export``."""
+    with open(path) as file:
+        data = json.load(file)
+    kind = data.get("kind")
+    if kind not in KINDS:
+        raise ValueError(f"Unsupported model artifact kind: {kind!r}")
+    return KINDS[kind].from_dict(data)
+
+
+def load_pickle(path):
+    """Loads a pickled model. Requires the library that trained it (scikit-learn)."""
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def load_model(path=DEFAULT_ARTIFACT, fallback=DEFAULT_PICKLE):
+    """Loads the fastest available model.
+
+    Uses the JSON artifact at ``path`` when it exists and is supported, otherwise
+    the pickle at ``fallback`` (or ``path`` itself if it is not a JSON file).
+    """
+    if path and path.endswith('.json') and os.path.exists(path):
+        try:
+            return load_artifact(path)
+        except (ValueError, KeyError):
+            if not fallback:
+                raise
+    elif path and not path.endswith('.json'):
+        return load_pickle(path)
+    if fallback:
+        return load_pickle(fallback)
+    raise FileNotFoundError(path)
+
+
+def export(estimator, path=DEFAULT_ARTIFACT):
+    """Exports a fitted estimator to a JSON artifact. Raises ValueError if unsupported."""
+    for kind in KINDS.values():
+        try:
+            model = kind.from_estimator(estimator)
+        except (ValueError, TypeError, AttributeError):
+            continue
+        model.save(path)
+        return model
+    raise ValueError(f"Unsupported model type: {type(estimator).__name__}")
+
+
+def main(argv):
+    if len(argv) < 1 or argv[0] != "export":
+        print(__doc__)
+        return 1
+    source = argv[1] if len(argv) > 1 else DEFAULT_PICKLE
+    target = argv[2] if len(argv) > 2 else DEFAULT_ARTIFACT
+    estimator = load_pickle(source)
+    try:
+        export(estimator, target)
+    except ValueError as e:
+        print(f"Not exported: {e}. The app will keep loading {source}.")
+        return 1
+    print(f"Exported {type(estimator).__name__} from {source} to {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
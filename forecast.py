@@ -0,0 +1,224 @@
+"""Next-day to next-week AQI forecasting from the daily history.
+
+Features come from lagged AQI, rolling means and calendar terms (day of week,
+Indian season). ``FeatureState`` keeps them up to date with running sums over
+short ring buffers, so appending a day costs O(1) no matter how long the
+history is. One linear model per horizon (1-7 days) is fitted with least
+squares and all horizons are predicted with a single dot product.
+
+Usage:
+    python forecast.py train [Bangalore_AQI_Dataset.csv] [--out forecast.json]
+    python forecast.py predict [--model forecast.json]
+    python forecast.py append DD/MM/YY AQI PM2.5 PM10 NO2 SO2 CO O3 [--model forecast.json]
+"""
+import argparse
+import json
+import os
+from collections import deque
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import engine
+
+FEATURES = engine.FEATURES
+HORIZONS = 7
+AQI_LAGS = (1, 2, 3, 7)
+AQI_WINDOWS = (3, 7, 30)
+POLLUTANT_WINDOW = 7
+DATE_FORMAT = "%d/%m/%y"
+DEFAULT_MODEL = "forecast.json"
+
+# Winter, summer, monsoon and post-monsoon by month (Jan = index 0)
+SEASONS = ("winter", "summer", "monsoon", "post-monsoon")
+MONTH_SEASON = (0, 0, 1, 1, 1, 2, 2, 2, 2, 3, 3, 0)
+
+FEATURE_NAMES = (
+    [f"aqi_lag{lag}" for lag in AQI_LAGS]
+    + [f"aqi_mean{window}" for window in AQI_WINDOWS]
+    + [f"{name}_mean{POLLUTANT_WINDOW}" for name in FEATURES]
+    + [f"dow_{day}" for day in range(1, 7)]
+    + [f"season_{season}" for season in SEASONS[1:]]
+)
+
+
+def parse_date(value):
+    """Parses the dataset's DD/MM/YY dates (datetime/date objects pass through)."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value.strip(), DATE_FORMAT).date()
+
+
+class FeatureState:
+    """Rolling forecast features maintained incrementally, one day at a time."""
+
+    def __init__(self):
+        self.history = max(max(AQI_LAGS), max(AQI_WINDOWS))
+        self.aqi = deque(maxlen=self.history)
+        self.aqi_sums = {window: 0.0 for window in AQI_WINDOWS}
+        self.pollutants = deque(maxlen=POLLUTANT_WINDOW)
+        self.pollutant_sum = np.zeros(len(FEATURES))
+        self.last_date = None
+
+    def __len__(self):
+        return len(self.aqi)
+
+    def _push(self, aqi, pollutants):
+        for window in AQI_WINDOWS:
+            if len(self.aqi) >= window:
+                self.aqi_sums[window] -= self.aqi[-window]
+            self.aqi_sums[window] += aqi
+        self.aqi.append(aqi)
+
+        if len(self.pollutants) == POLLUTANT_WINDOW:
+            self.pollutant_sum -= self.pollutants[0]
+        self.pollutants.append(pollutants)
+        self.pollutant_sum += pollutants
+
+    def update(self, day, aqi, pollutants):
+        """Adds one day's reading. Missing days in between repeat the previous reading."""
+        day = parse_date(day)
+        pollutants = np.asarray(pollutants, dtype=float)
+        if self.last_date is not None:
+            gap = (day - self.last_date).days
+            if gap <= 0:
+                raise ValueError(f"Readings must be appended in date order (last was {self.last_date})")
+            for _ in range(min(gap - 1, self.history)):
+                self._push(self.aqi[-1], self.pollutants[-1])
+        self._push(float(aqi), pollutants)
+        self.last_date = day
+
+    def features(self):
+        """Returns the feature vector for the latest day, in FEATURE_NAMES order."""
+        if not self.aqi:
+            raise ValueError("No readings yet")
+        values = [self.aqi[-min(lag, len(self.aqi))] for lag in AQI_LAGS]
+        values += [self.aqi_sums[window] / min(window, len(self.aqi)) for window in AQI_WINDOWS]
+        values += list(self.pollutant_sum / len(self.pollutants))
+        dow = self.last_date.weekday()
+        values += [1.0 if dow == day else 0.0 for day in range(1, 7)]
+        season = MONTH_SEASON[self.last_date.month - 1]
+        values += [1.0 if season == i else 0.0 for i in range(1, len(SEASONS))]
+        return np.array(values)
+
+    def to_dict(self):
+        return {
+            "aqi": list(self.aqi),
+            "pollutants": [list(row) for row in self.pollutants],
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds the state, and its running sums, from saved buffers."""
+        state = cls()
+        state.aqi.extend(float(value) for value in data["aqi"])
+        values = list(state.aqi)
+        for window in AQI_WINDOWS:
+            state.aqi_sums[window] = float(sum(values[-window:]))
+        state.pollutants.extend(np.asarray(row, dtype=float) for row in data["pollutants"])
+        state.pollutant_sum = np.sum(list(state.pollutants), axis=0) if state.pollutants else np.zeros(len(FEATURES))
+        state.last_date = date.fromisoformat(data["last_date"]) if data["last_date"] else None
+        return state
+
+
+class Forecaster:
+    """Per-horizon linear forecasts on top of an incrementally updated FeatureState."""
+
+    def __init__(self, coef=None, state=None):
+        self.coef = None if coef is None else np.asarray(coef, dtype=float)
+        self.state = state or FeatureState()
+
+    def fit(self, days, aqi, pollutants):
+        """Fits the horizon models on a daily history and leaves the state at its last day."""
+        aqi = np.asarray(aqi, dtype=float)
+        pollutants = np.asarray(pollutants, dtype=float)
+        state = FeatureState()
+        rows = []
+        for day, value, reading in zip(days, aqi, pollutants):
+            state.update(day, value, reading)
+            rows.append(state.features())
+        X = np.column_stack([np.ones(len(rows)), np.array(rows)])
+
+        warmup = max(AQI_WINDOWS) - 1
+        coef = np.zeros((X.shape[1], HORIZONS))
+        for h in range(1, HORIZONS + 1):
+            usable = slice(warmup, len(X) - h)
+            if usable.stop - usable.start < X.shape[1]:
+                raise ValueError("Not enough history to fit the forecast models")
+            coef[:, h - 1] = np.linalg.lstsq(X[usable], aqi[warmup + h:], rcond=None)[0]
+        self.coef = coef
+        self.state = state
+        return self
+
+    def append(self, day, aqi, pollutants):
+        """Adds a new day's reading (O(1)) and returns the fresh forecast."""
+        self.state.update(day, aqi, pollutants)
+        return self.forecast()
+
+    def forecast(self, horizons=HORIZONS):
+        """Returns [(date, predicted AQI), ...] for the next ``horizons`` days."""
+        if self.coef is None:
+            raise ValueError("Forecaster has not been fitted")
+        x = np.concatenate([[1.0], self.state.features()])
+        values = x @ self.coef[:, :horizons]
+        return [(self.state.last_date + timedelta(days=h + 1), float(value)) for h, value in enumerate(values)]
+
+    def save(self, path=DEFAULT_MODEL):
+        """Writes coefficients and state atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({
+                "features": FEATURE_NAMES,
+                "coef": self.coef.tolist(),
+                "state": self.state.to_dict(),
+            }, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL):
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("features") != FEATURE_NAMES:
+            raise ValueError(f"{path} was built with different forecast features; retrain it")
+        return cls(data["coef"], FeatureState.from_dict(data["state"]))
+
+
+def fit_csv(path="Bangalore_AQI_Dataset.csv"):
+    """Fits a Forecaster on a CSV with the dataset's columns (Date, AQI and pollutants)."""
+    import pandas as pd
+
+    data = pd.read_csv(path, encoding='utf-8-sig')
+    data = data.dropna(subset=['Date', 'AQI'] + FEATURES)
+    data['Date'] = pd.to_datetime(data['Date'], format=DATE_FORMAT)
+    data = data.sort_values('Date').drop_duplicates('Date', keep='last')
+    return Forecaster().fit(data['Date'].dt.date, data['AQI'], data[FEATURES])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast AQI for the next 1-7 days.")
+    parser.add_argument("command", choices=["train", "predict", "append"])
+    parser.add_argument("values", nargs="*",
+                        help="train: CSV path; append: DD/MM/YY AQI PM2.5 PM10 NO2 SO2 CO O3")
+    parser.add_argument("--model", "--out", dest="model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        forecaster = fit_csv(args.values[0] if args.values else "Bangalore_AQI_Dataset.csv")
+        forecaster.save(args.model)
+        print(f"Saved forecast model to {args.model} (history up to {forecaster.state.last_date})")
+    else:
+        forecaster = Forecaster.load(args.model)
+        if args.command == "append":
+            if len(args.values) != 2 + len(FEATURES):
+                parser.error("append needs DD/MM/YY AQI PM2.5 PM10 NO2 SO2 CO O3")
+            forecaster.append(args.values[0], float(args.values[1]), [float(v) for v in args.values[2:]])
+            forecaster.save(args.model)
+    for day, value in forecaster.forecast():
+        print(f"{day:%a %d/%m/%y}  AQI {value:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Analog AQI meter (SVG) used by 5.py, and bulk bulletins of many meters.
+
+The dial, coloured arcs and labels don't depend on the predicted value, so they
+are built once per process (per glow class). The needle is clamped to 0-500 and
+drawn at the nearest integer AQI (the value the meter displays), so its markup
+is precomputed once for all 501 positions; a meter is then a handful of string
+joins, and thousands of station gauges render in a few milliseconds.
+
+Usage:
+    python gauge.py bulletin predictions.csv [--out bulletin.html] [--svg-dir gauges] [--title "Daily AQI"]
+"""
+import argparse
+import html
+import math
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import aqi_index
+
+# Adjusted for larger meter
+CX, CY = 250, 250  # Center of the SVG viewBox
+R = 180  # Radius of the main arc
+
+START_ANGLE_DEG = 210
+END_ANGLE_DEG = -30
+ANGLE_RANGE_DEG = START_ANGLE_DEG - END_ANGLE_DEG
+
+NEEDLE_LENGTH = R * 0.8
+NEEDLE_TAIL_LENGTH = R * 0.15
+
+METER_SEGMENTS = [
+    (0, 50, "#00FF00", "good", "Good"),
+    (51, 100, "#ADFF2F", "moderate", "Moderate"),
+    (101, 150, "#FFA500", "sensitive", "Sensitive"),
+    (151, 200, "#FF4500", "unhealthy", "Unhealthy"),
+    (201, 300, "#FF1493", "very-unhealthy", "Very Unhealthy"),
+    (301, 500, "#8B0000", "hazardous", "Hazardous")
+]
+MAX_AQI = 500
+NEEDLE_END = '" class="meter-needle" />'
+# Referenced by the arcs as url(#glow); one definition per HTML page is enough
+GLOW_FILTER = """
+                            <filter id="glow">
+                                <feGaussianBlur in="SourceGraphic" stdDeviation="6" result="blur" />
+                                <feColorMatrix in="blur" mode="matrix" values="
+                                    1 0 0 0 0
+                                    0 1 0 0 0
+                                    0 0 1 0 0
+                                    0 0 0 15 0" result="colormatrix" />
+                                <feMerge>
+                                    <feMergeNode in="colormatrix" />
+                                    <feMergeNode in="SourceGraphic" />
+                                </feMerge>
+                            </filter>
+"""
+
+
+def polarToCartesian(centerX, centerY, radius, angleInDegrees):
+    angleInRadians = (angleInDegrees - 90) * math.pi / 180.0
+    return centerX + (radius * math.cos(angleInRadians)), centerY + (radius * math.sin(angleInRadians))
+
+
+@lru_cache(maxsize=None)
+def arcs_and_labels(glow_class=""):
+    """Returns the (arcs, labels) SVG fragments for the meter segments."""
+    arc_paths = []
+    aqi_labels = []
+
+    for start_aqi, end_aqi, seg_color, seg_class, label_text in METER_SEGMENTS:
+        seg_start_angle_deg = START_ANGLE_DEG - (start_aqi / 500) * ANGLE_RANGE_DEG
+        seg_end_angle_deg = START_ANGLE_DEG - (end_aqi / 500) * ANGLE_RANGE_DEG
+
+        # For a sweep flag of 0, start_angle_deg should be greater than end_angle_deg
+        x1, y1 = polarToCartesian(CX, CY, R, seg_start_angle_deg - 90)  # Adjust for polarToCartesian
+        x2, y2 = polarToCartesian(CX, CY, R, seg_end_angle_deg - 90)    # Adjust for polarToCartesian
+
+        # Adjust large_arc_flag and sweep_flag for accurate arc drawing
+        large_arc_flag = 1 if abs(seg_end_angle_deg - seg_start_angle_deg) > 180 else 0
+        sweep_flag = 0 if seg_end_angle_deg < seg_start_angle_deg else 1  # Ensure correct sweep direction
+
+        path_d = f"M {x1:.3f} {y1:.3f} A {R} {R} 0 {large_arc_flag} {sweep_flag} {x2:.3f} {y2:.3f}"
+        arc_paths.append(f'<path d="{path_d}" fill="none" stroke="{seg_color}" class="meter-arc-segment {glow_class}"/>')
+
+        # Add labels for each segment
+        mid_aqi = (start_aqi + end_aqi) / 2
+        label_angle_deg = START_ANGLE_DEG - (mid_aqi / 500) * ANGLE_RANGE_DEG
+        label_angle_rad = math.radians(label_angle_deg)
+        label_r = R + 30  # Distance of label from center
+
+        label_x = CX + label_r * math.cos(label_angle_rad)
+        label_y = CY - label_r * math.sin(label_angle_rad)  # Y-axis inverted for SVG
+
+        aqi_labels.append(f'<text x="{label_x:.1f}" y="{label_y:.1f}" class="aqi-label" fill="{seg_color}">{label_text}</text>')
+
+    return "\n".join(arc_paths), "\n".join(aqi_labels)
+
+
+def needle_coordinates(predicted_aqi):
+    """Returns (x1, y1, x2, y2) of the needle for an AQI value, clamped to 0-500."""
+    aqi_normalized = min(max(0, predicted_aqi), 500)
+    current_angle_deg = START_ANGLE_DEG - (aqi_normalized / 500) * ANGLE_RANGE_DEG
+    current_angle_rad = math.radians(current_angle_deg)
+
+    needle_x1 = CX - NEEDLE_TAIL_LENGTH * math.cos(current_angle_rad)
+    needle_y1 = CY - NEEDLE_TAIL_LENGTH * math.sin(current_angle_rad)
+    needle_x2 = CX + NEEDLE_LENGTH * math.cos(current_angle_rad)
+    needle_y2 = CY + NEEDLE_LENGTH * math.sin(current_angle_rad)
+    return needle_x1, needle_y1, needle_x2, needle_y2
+
+
+def needle_position(predicted_aqi):
+    """Integer needle position for an AQI value: clamped to 0-500, rounded like the displayed value."""
+    return int(round(min(max(0, predicted_aqi), MAX_AQI)))
+
+
+@lru_cache(maxsize=None)
+def needle_fragments():
+    """The needle <line> markup up to its stroke colour, for every integer position 0-500."""
+    fragments = []
+    for position in range(MAX_AQI + 1):
+        x1, y1, x2, y2 = needle_coordinates(position)
+        fragments.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="')
+    return fragments
+
+
+@lru_cache(maxsize=None)
+def meter_parts(glow_class="", standalone=False, compact=False, glow_filter=True):
+    """Returns the static (head, middle, tail) markup around the needle and the value text.
+
+    ``standalone`` gives a self-contained SVG document (namespace and styles
+    inline) for files instead of markup styled by the page's CSS; ``compact``
+    drops the indentation, which adds up over thousands of meters. Without
+    ``glow_filter`` the SVG relies on a #glow filter defined elsewhere on the page.
+    """
+    all_arcs_svg, all_labels_svg = arcs_and_labels(glow_class)
+    glow_defs = f"<defs>{GLOW_FILTER}</defs>" if glow_filter else ""
+    if standalone:
+        svg_open = f'<svg xmlns="http://www.w3.org/2000/svg" class="meter-svg" viewBox="0 0 500 300"><style>{SVG_CSS}</style>'
+    else:
+        svg_open = '<svg class="meter-svg" viewBox="0 0 500 300">'
+    head = f"""
+                    {svg_open}
+                        <circle cx="250" cy="250" r="180" class="meter-dial" />
+
+                        {glow_defs}
+
+                        {all_arcs_svg}
+
+                        """
+    middle = f"""
+
+                        <circle cx="{CX}" cy="{CY}" r="12" class="meter-center" />
+
+                        <text x="250" y="270" class="meter-text">AQI</text>
+
+                        <text x="250" y="220" class="aqi-value-display">"""
+    tail = f"""</text>
+
+                        {all_labels_svg}
+
+                        <text x="70" y="250" fill="#00FF00" font-size="1em" font-family="Orbitron, sans-serif" text-anchor="middle">0</text>
+                        <text x="430" y="250" fill="#8B0000" font-size="1em" font-family="Orbitron, sans-serif" text-anchor="middle">500+</text>
+
+                    </svg>"""
+    if compact:
+        head, middle, tail = (" ".join(part.split()).replace("> <", "><") for part in (head, middle, tail))
+    return head, middle, tail
+
+
+def meter_svg(predicted_aqi, color, glow_class="", standalone=False):
+    """Returns the meter SVG for one prediction."""
+    head, middle, tail = meter_parts(glow_class, standalone)
+    needle = needle_fragments()[needle_position(predicted_aqi)]
+    return f"{head}{needle}{color}{NEEDLE_END}{middle}{predicted_aqi:.0f}{tail}"
+
+
+def meter_html(predicted_aqi, color, glow_class=""):
+    """Returns the full analog meter markup for a prediction."""
+    return f"""
+                <div class="analog-meter-container">{meter_svg(predicted_aqi, color, glow_class)}
+                </div>
+            """
+
+
+# --- Bulk rendering for bulletins ---
+# Concrete colours instead of the app's CSS variables, and no animations, so
+# files look the same in any viewer and when printed to PDF
+SVG_CSS = (
+    ".meter-svg{background-color:#161b22;-webkit-print-color-adjust:exact;print-color-adjust:exact}"
+    ".meter-dial{fill:none;stroke:#30363d;stroke-width:10}"
+    ".meter-arc-segment{stroke-width:30;filter:url(#glow)}"
+    ".meter-needle{stroke-width:8;stroke-linecap:round}"
+    ".meter-center{fill:#c9d1d9;stroke:#8a2be2;stroke-width:3}"
+    ".meter-text{fill:#c9d1d9;font-family:Orbitron,sans-serif;font-size:1.5em;text-anchor:middle}"
+    ".aqi-value-display{fill:#58a6ff;font-family:Orbitron,sans-serif;font-size:3.5em;font-weight:bold;"
+    "text-anchor:middle}"
+    ".aqi-label{font-family:Roboto,sans-serif;font-size:0.8em;font-weight:bold;text-anchor:middle}"
+)
+
+BULLETIN_CSS = """
+    @page { size: A4; margin: 12mm; }
+    body { font-family: Roboto, sans-serif; background: #0d1117; color: #c9d1d9; margin: 0; padding: 16px;
+           -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+    h1 { font-family: Orbitron, sans-serif; color: #58a6ff; margin: 0 0 4px; }
+    .summary { margin: 0 0 16px; }
+    .cards { display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 12px; }
+    .card { background: #161b22; border: 2px solid #8a2be2; border-radius: 12px; padding: 10px;
+            break-inside: avoid; page-break-inside: avoid; }
+    .card h2 { font-size: 1.1em; margin: 0; }
+    .card p { margin: 2px 0 6px; font-weight: bold; }
+    .card svg { width: 100%; height: auto; }
+"""
+
+
+def render_batch(aqi_values, standalone=True, compact=True, glow_filter=True):
+    """Meter SVGs for a whole batch of predictions, in input order.
+
+    Categories come from one vectorized lookup and every needle from the
+    precomputed positions, so nothing is recomputed per meter.
+    """
+    aqi = np.asarray(aqi_values, dtype=float).ravel()
+    index = aqi_index.category_index(aqi)
+    positions = np.rint(np.clip(np.nan_to_num(aqi, nan=0.0), 0, MAX_AQI)).astype(int)
+    needles = needle_fragments()
+    parts = [meter_parts(str(glow), standalone, compact, glow_filter) for glow in aqi_index.CATEGORY_GLOW]
+    colors = [str(color) for color in aqi_index.CATEGORY_COLORS]
+    values = [str(v) for v in range(MAX_AQI + 1)]
+    svgs = []
+    for value, i, position in zip(aqi.tolist(), index.tolist(), positions.tolist()):
+        head, middle, tail = parts[i]
+        if value != value:
+            text = "–"
+        elif 0 <= value <= MAX_AQI:
+            text = values[position]
+        else:
+            text = f"{value:.0f}"
+        svgs.append(f"{head}{needles[position]}{colors[i]}{NEEDLE_END}{middle}{text}{tail}")
+    return svgs
+
+
+def bulletin_html(stations, aqi_values, title="Daily AQI Bulletin", subtitle=""):
+    """One print-ready HTML page with a card and meter per station.
+
+    Open it in a browser and print to PDF for a PDF bulletin.
+    """
+    aqi = np.asarray(aqi_values, dtype=float).ravel()
+    index = aqi_index.category_index(aqi)
+    labels = [html.escape(str(label)) for label in aqi_index.CATEGORY_LABELS]
+    cards = []
+    svgs = render_batch(aqi, standalone=False, glow_filter=False)
+    for station, value, i, svg in zip(stations, aqi.tolist(), index.tolist(), svgs):
+        shown = "no data" if value != value else f"{value:.0f}"
+        cards.append(f'<div class="card"><h2>{html.escape(str(station))}</h2>'
+                     f'<p>AQI {shown} · {labels[i]}</p>{svg}</div>')
+    counts = np.bincount(index, minlength=len(aqi_index.CATEGORY_NAMES))
+    summary = ", ".join(f"{count} {name}" for name, count in zip(aqi_index.CATEGORY_NAMES, counts) if count)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f"<style>{BULLETIN_CSS}{SVG_CSS}</style></head><body>"
+            f'<svg width="0" height="0" style="position:absolute" aria-hidden="true"><defs>'
+            f'{" ".join(GLOW_FILTER.split())}</defs></svg>'
+            f"<h1>{html.escape(title)}</h1><p class=\"summary\">{html.escape(subtitle)} {len(aqi)} stations: "
+            f"{html.escape(summary)}</p><div class=\"cards\">{''.join(cards)}</div></body></html>\n")
+
+
+def write_svgs(stations, aqi_values, directory):
+    """Writes one standalone <station>.svg per prediction into ``directory`` (repeated names get -2, -3, ...)."""
+    os.makedirs(directory, exist_ok=True)
+    seen = {}
+    for station, svg in zip(stations, render_batch(aqi_values, standalone=True)):
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(station)) or "station"
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}-{seen[name]}"
+        with open(os.path.join(directory, f"{name}.svg"), 'w', encoding='utf-8') as file:
+            file.write(svg)
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Render AQI gauges and a bulletin for a batch of predictions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bulletin = sub.add_parser("bulletin", help="One HTML bulletin (print to PDF) for a predictions CSV")
+    bulletin.add_argument("source", help="CSV with a station column and predicted AQI (e.g. batch.py output)")
+    bulletin.add_argument("--out", default="bulletin.html")
+    bulletin.add_argument("--svg-dir", help="Also write one standalone SVG per station here")
+    bulletin.add_argument("--station-column", default="City")
+    bulletin.add_argument("--aqi-column", default="Predicted_AQI")
+    bulletin.add_argument("--title", default="Daily AQI Bulletin")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.source, encoding='utf-8-sig')
+    if args.aqi_column not in data.columns:
+        raise SystemExit(f"{args.source} has no {args.aqi_column!r} column")
+    stations = (data[args.station_column].astype(str) if args.station_column in data.columns
+                else pd.Series([f"Station {i + 1}" for i in range(len(data))]))
+    aqi = pd.to_numeric(data[args.aqi_column], errors='coerce').to_numpy(dtype=float)
+
+    start = time.perf_counter()
+    page = bulletin_html(stations, aqi, args.title)
+    seconds = time.perf_counter() - start
+    tmp_path = f"{args.out}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(page)
+    os.replace(tmp_path, args.out)
+    print(f"Rendered {len(aqi):,} gauges in {seconds * 1000:.1f} ms into {args.out} ({len(page) / 2 ** 20:.1f} MiB)")
+    if args.svg_dir:
+        write_svgs(stations, aqi, args.svg_dir)
+        print(f"Wrote {len(aqi):,} SVG files to {args.svg_dir}")
+
+
+if __name__ == "__main__":
+    main()
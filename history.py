@@ -0,0 +1,243 @@
+"""Columnar, memory-mapped store for historical readings.
+
+The converter streams a CSV export (same columns as Bangalore_AQI_Dataset.csv)
+into one directory per city, station and year; the station comes from the
+``--by`` column (the city itself when an export has one station per city).
+Each column is a typed ``.npy`` file sorted by timestamp, so a reader can
+memory-map only the partitions a query touches and find the date range with a
+binary search. Timestamps are stored in seconds, so hourly station data fits
+as well as daily. Readers keep at most ``MAX_OPEN_ARRAYS`` files mapped.
+
+    history_store/
+        manifest.json
+        city=Bangalore/station=Bangalore/year=2018/time.npy, AQI.npy, PM2.5.npy, ...
+
+Usage:
+    python history.py convert [Bangalore_AQI_Dataset.csv] [--store history_store] [--by Station]
+    python history.py query Bangalore 2022-03-01 2022-03-31 [--station Hebbal] [--columns PM2.5 AQI]
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import engine
+
+DEFAULT_STORE = "history_store"
+DATE_FORMAT = "%d/%m/%y"
+VALUE_COLUMNS = ['AQI'] + engine.FEATURES
+TIME_DTYPE = np.int64  # seconds since the epoch
+VALUE_DTYPE = np.float32
+DEFAULT_CITY = "Unknown"
+# Each mapped file holds a descriptor; least recently used ones are dropped beyond this
+MAX_OPEN_ARRAYS = 256
+
+
+def _partition_dir(store, city, year, station=None):
+    # Stores written before stations were kept have no station level
+    if station is None:
+        return os.path.join(store, f"city={city}", f"year={year}")
+    return os.path.join(store, f"city={city}", f"station={station}", f"year={year}")
+
+
+def convert(source, store=DEFAULT_STORE, date_format=DATE_FORMAT, chunksize=500_000, by="City"):
+    """Converts a CSV export into a partitioned columnar store. Returns the manifest.
+
+    ``by`` names the station column; rows without one fall back to their city.
+    """
+    import pandas as pd
+
+    staging = f"{store}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    # Pass 1: append each chunk's rows to raw per-partition column files
+    partitions = set()
+    for chunk in pd.read_csv(source, chunksize=chunksize, encoding='utf-8-sig'):
+        times = pd.to_datetime(chunk['Date'], format=date_format, errors='coerce')
+        chunk = chunk.assign(_time=times).dropna(subset=['_time'])
+        if 'City' not in chunk.columns:
+            chunk['City'] = DEFAULT_CITY
+        chunk['City'] = chunk['City'].fillna(DEFAULT_CITY).astype(str)
+        if by in chunk.columns:
+            chunk['_station'] = chunk[by].astype(str).where(chunk[by].notna(), chunk['City'])
+        else:
+            chunk['_station'] = chunk['City']
+        chunk['_year'] = chunk['_time'].dt.year
+        for (city, station, year), part in chunk.groupby(['City', '_station', '_year']):
+            path = _partition_dir(staging, city, year, station)
+            os.makedirs(path, exist_ok=True)
+            partitions.add((city, station, int(year)))
+            seconds = (part['_time'].to_numpy(dtype='datetime64[s]').astype(TIME_DTYPE))
+            with open(os.path.join(path, "time.bin"), 'ab') as file:
+                file.write(seconds.tobytes())
+            for column in VALUE_COLUMNS:
+                values = pd.to_numeric(part[column], errors='coerce') if column in part else np.nan
+                values = np.broadcast_to(np.asarray(values, dtype=VALUE_DTYPE), len(part))
+                with open(os.path.join(path, f"{column}.bin"), 'ab') as file:
+                    file.write(np.ascontiguousarray(values).tobytes())
+
+    # Pass 2: sort every partition by time and write memory-mappable .npy files
+    manifest = {"columns": VALUE_COLUMNS, "station_column": by, "partitions": []}
+    for city, station, year in sorted(partitions):
+        path = _partition_dir(staging, city, year, station)
+        times = np.fromfile(os.path.join(path, "time.bin"), dtype=TIME_DTYPE)
+        order = np.argsort(times, kind='stable')
+        np.save(os.path.join(path, "time.npy"), times[order])
+        os.remove(os.path.join(path, "time.bin"))
+        for column in VALUE_COLUMNS:
+            values = np.fromfile(os.path.join(path, f"{column}.bin"), dtype=VALUE_DTYPE)
+            np.save(os.path.join(path, f"{column}.npy"), values[order])
+            os.remove(os.path.join(path, f"{column}.bin"))
+        manifest["partitions"].append({
+            "city": city,
+            "station": station,
+            "year": year,
+            "rows": int(len(times)),
+            "start": int(times[order[0]]),
+            "end": int(times[order[-1]]),
+        })
+    with open(os.path.join(staging, "manifest.json"), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    shutil.rmtree(store, ignore_errors=True)
+    os.replace(staging, store)
+    return manifest
+
+
+def _to_seconds(value):
+    return int(np.datetime64(value, 's').astype(TIME_DTYPE))
+
+
+class HistoryStore:
+    """Reads a store written by ``convert`` without loading more than a query needs."""
+
+    def __init__(self, store=DEFAULT_STORE):
+        self.store = store
+        with open(os.path.join(store, "manifest.json")) as file:
+            self.manifest = json.load(file)
+        self.columns = self.manifest["columns"]
+        self.max_open = MAX_OPEN_ARRAYS
+        self._arrays = OrderedDict()  # (city, station, year, column) -> memmap, least recently used first
+        self._lock = threading.Lock()
+
+    def cities(self):
+        return sorted({part["city"] for part in self.manifest["partitions"]})
+
+    def stations(self, city):
+        return sorted({part.get("station", city) for part in self._partitions(city)})
+
+    def _partitions(self, city, station=None):
+        return [part for part in self.manifest["partitions"]
+                if part["city"] == city and (station is None or part.get("station", city) == station)]
+
+    def date_range(self, city, station=None):
+        """Returns the (first, last) timestamp stored for a city (or one of its stations) as datetime64[s]."""
+        parts = self._partitions(city, station)
+        if not parts:
+            raise KeyError(f"No history for city {city!r}" + (f" station {station!r}" if station else ""))
+        return (np.datetime64(min(part["start"] for part in parts), 's'),
+                np.datetime64(max(part["end"] for part in parts), 's'))
+
+    def _array(self, part, column):
+        key = (part["city"], part.get("station"), part["year"], column)
+        with self._lock:
+            array = self._arrays.get(key)
+            if array is not None:
+                self._arrays.move_to_end(key)
+                return array
+        path = os.path.join(_partition_dir(self.store, part["city"], part["year"], part.get("station")),
+                            f"{column}.npy")
+        array = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._arrays[key] = array
+            while len(self._arrays) > self.max_open:
+                self._arrays.popitem(last=False)
+        return array
+
+    def query(self, city, start, end, columns=None, station=None):
+        """Returns {'time': datetime64[s], 'station': names, column: values, ...} for start <= time <= end.
+
+        ``start``/``end`` are anything ``np.datetime64`` accepts (e.g. '2022-03-01'); a
+        bare date as ``end`` covers that whole day. Without ``station`` every station
+        of the city is returned, merged in time order.
+        """
+        columns = list(columns or self.columns)
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise KeyError(f"Unknown columns: {', '.join(unknown)}")
+        lo = _to_seconds(start)
+        hi = _to_seconds(end)
+        if np.datetime64(end).dtype == np.dtype('datetime64[D]'):
+            hi += 86_400 - 1
+
+        pieces = {"time": [], "station": []}
+        pieces.update({column: [] for column in columns})
+        for part in self._partitions(city, station):
+            if part["end"] < lo or part["start"] > hi:
+                continue
+            times = self._array(part, "time")
+            i = np.searchsorted(times, lo, side='left')
+            j = np.searchsorted(times, hi, side='right')
+            if i >= j:
+                continue
+            pieces["time"].append(np.asarray(times[i:j]))
+            pieces["station"].append(np.full(j - i, part.get("station", city), dtype=object))
+            for column in columns:
+                pieces[column].append(np.asarray(self._array(part, column)[i:j]))
+
+        result = {}
+        for name, arrays in pieces.items():
+            dtype = {"time": TIME_DTYPE, "station": object}.get(name, VALUE_DTYPE)
+            result[name] = np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+        # Partitions are in (station, year) order; interleave the stations by time
+        if len(pieces["station"]) > 1 and len({piece[0] for piece in pieces["station"]}) > 1:
+            order = np.argsort(result["time"], kind='stable')
+            result = {name: values[order] for name, values in result.items()}
+        result["time"] = result["time"].astype('datetime64[s]')
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and query the columnar history store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="Convert a CSV export into the store")
+    conv.add_argument("source", nargs="?", default="Bangalore_AQI_Dataset.csv")
+    conv.add_argument("--date-format", default=DATE_FORMAT)
+    conv.add_argument("--by", default="City", help="Column naming the station (default: City)")
+    query = sub.add_parser("query", help="Print readings for a city and date range")
+    query.add_argument("city")
+    query.add_argument("start", help="e.g. 2022-03-01")
+    query.add_argument("end", help="e.g. 2022-03-31")
+    query.add_argument("--station", help="One station of the city (default: all, merged by time)")
+    query.add_argument("--columns", nargs="+")
+    for command in (conv, query):
+        command.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        start = time.perf_counter()
+        manifest = convert(args.source, args.store, args.date_format, by=args.by)
+        rows = sum(part["rows"] for part in manifest["partitions"])
+        print(f"Wrote {rows} rows in {len(manifest['partitions'])} partitions to {args.store} "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    store = HistoryStore(args.store)
+    start = time.perf_counter()
+    result = store.query(args.city, args.start, args.end, args.columns, args.station)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    columns = [name for name in result if name not in ("time", "station")]
+    for i in range(len(result["time"])):
+        values = "  ".join(f"{name} {result[name][i]:.2f}" for name in columns)
+        print(f"{result['time'][i]}  {result['station'][i]}  {values}")
+    print(f"{len(result['time'])} rows in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""Streaming ingestion of CAAQMS sensor readings.
+
+Readings arrive as JSON lines from a tailed file or a TCP socket, are
+validated, queued, screened for sensor faults (``quality.py``) and sent
+through ``predict`` in batches. The queue is
+bounded: when it is full, readers wait instead of buffering (backpressure).
+The file tailer stops reading the file and socket readers stop reading their
+connection, so TCP flow control slows fast senders down and a burst from many
+stations can't exhaust memory.
+
+One reading per line:
+    {"station": "Peenya", "time": "2024-01-01T10:00", "PM2.5": 37.4, "PM10": 73.4, "NO2": 56.4,
+     "SO2": 77.5, "CO": 0.71, "O3": 64.6}
+
+Usage:
+    python ingest.py run [--jsonl feed.jsonl] [--port 8700] [--max-queue 10000] [--max-batch 512] [--no-screen]
+    python ingest.py replay Bangalore_AQI_Dataset.csv [--jsonl feed.jsonl | --connect 127.0.0.1:8700]
+                            [--rate 10] [--stations 1] [--loop]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+
+import numpy as np
+
+import aqi_index
+import engine
+import forecast
+import metrics
+import quality
+
+DEFAULT_FEED = "feed.jsonl"
+DEFAULT_PORT = 8700
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_MAX_BATCH = 512
+DEFAULT_WINDOW = 0.05  # seconds to let a batch build up when the queue is short
+MAX_LINE_BYTES = 64 * 1024
+MAX_STATIONS = 10_000
+READ_CHUNK = 64 * 1024
+
+Reading = namedtuple("Reading", "station time features")
+
+
+def validate(record):
+    """Turns a decoded JSON record into a Reading, raising ValueError if it can't be scored."""
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object")
+    features = engine.parse_row(record)  # also rejects non-finite and negative values
+    return Reading(str(record.get("station", "default")), record.get("time"), features)
+
+
+class Pipeline:
+    """Bounded queue of validated readings, batched into ``predict`` calls on an asyncio loop.
+
+    ``get_model`` is called once per batch, so a model reloaded from disk is picked up.
+    With a ``screen`` (a ``quality.StreamValidator``), readings it flags are held back
+    from ``predict`` and counted as suspect. The latest result per station and a
+    short window of recent results are kept for dashboards; both are bounded.
+    """
+
+    def __init__(self, get_model, max_queue=DEFAULT_MAX_QUEUE, max_batch=DEFAULT_MAX_BATCH,
+                 window=DEFAULT_WINDOW, validator=validate, screen=None, max_stations=MAX_STATIONS,
+                 recent=1000):
+        self.get_model = get_model
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.window = window
+        self.validator = validator
+        self.screen = screen
+        self.max_stations = max_stations
+        self.queue = None  # created on the pipeline's event loop
+        self._lock = threading.Lock()
+        self._latest = OrderedDict()  # station -> result dict
+        self._recent = deque(maxlen=recent)
+        self.counts = Counter()
+        self.backpressure_seconds = 0.0
+        self.queue_high_water = 0
+        self.last_error = None
+        self.last_suspect = None  # (station, time, flags)
+        self._thread = None
+
+    def _reject(self, error):
+        with self._lock:
+            self.counts["rejected"] += 1
+            self.last_error = str(error)
+
+    async def submit(self, line):
+        """Validates one raw line and queues it, waiting while the queue is full."""
+        try:
+            reading = self.validator(json.loads(line))
+        except (ValueError, TypeError) as e:
+            self._reject(e)
+            return False
+        with self._lock:
+            self.counts["received"] += 1
+        if self.queue.full():
+            start = time.perf_counter()
+            await self.queue.put(reading)
+            waited = time.perf_counter() - start
+            with self._lock:
+                self.counts["backpressure_waits"] += 1
+                self.backpressure_seconds += waited
+        else:
+            self.queue.put_nowait(reading)
+        self.queue_high_water = max(self.queue_high_water, self.queue.qsize())
+        return True
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        # Wait for the batch to fill only if it can still grow: a queue smaller than
+        # max_batch never holds a full batch, and a full queue won't get any fuller
+        target = min(self.max_batch, self.max_queue) if self.max_queue > 0 else self.max_batch
+        if self.queue.qsize() < target - 1 and not self.queue.full():
+            await asyncio.sleep(self.window)
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    def _screen(self, batch):
+        """Drops readings the screen flags; each station's readings are checked in arrival order."""
+        by_station = {}
+        for i, reading in enumerate(batch):
+            by_station.setdefault(reading.station, []).append(i)
+        keep = np.ones(len(batch), dtype=bool)
+        for station, index in by_station.items():
+            verdicts = self.screen.check_many(station, [batch[i].features for i in index],
+                                              [batch[i].time for i in index])
+            for i, verdict in zip(index, verdicts):
+                if not verdict.ok:
+                    keep[i] = False
+                    self.last_suspect = (batch[i].station, batch[i].time, quality.format_flags(verdict.flags))
+        with self._lock:
+            self.counts["suspect"] += int(len(batch) - keep.sum())
+        return [reading for reading, kept in zip(batch, keep) if kept]
+
+    async def predict_loop(self):
+        while True:
+            batch = await self._next_batch()
+            if self.screen is not None:
+                batch = self._screen(batch)
+                if not batch:
+                    continue
+            rows = np.array([reading.features for reading in batch], dtype=float)
+            try:
+                model = self.get_model()
+                with metrics.span("ingest_predict"):
+                    # Off the event loop so readers keep draining sockets while numpy works
+                    aqi = np.asarray(await asyncio.to_thread(model.predict, rows), dtype=float)
+            except Exception as e:
+                with self._lock:
+                    self.counts["failed"] += len(batch)
+                    self.last_error = f"Prediction failed: {e}"
+                continue
+            self._publish(batch, aqi, aqi_index.categorize(aqi))
+
+    def _publish(self, batch, aqi, categories):
+        received = time.time()
+        with self._lock:
+            for reading, value, category in zip(batch, aqi.tolist(), categories.tolist()):
+                result = {"station": reading.station, "time": reading.time, "aqi": value,
+                          "category": category, "received": received}
+                self._latest[reading.station] = result
+                self._latest.move_to_end(reading.station)
+                self._recent.append(result)
+            while len(self._latest) > self.max_stations:
+                self._latest.popitem(last=False)
+            self.counts["predicted"] += len(batch)
+            self.counts["batches"] += 1
+
+    async def run(self, jsonl=None, host="127.0.0.1", port=None, from_start=True):
+        """Runs the sources and the predict loop until cancelled."""
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        tasks = [self.predict_loop()]
+        if jsonl:
+            tasks.append(tail_jsonl(self, jsonl, from_start=from_start))
+        if port:
+            tasks.append(serve_socket(self, host, port))
+        await asyncio.gather(*tasks)
+
+    def start(self, jsonl=None, host="127.0.0.1", port=None, from_start=True):
+        """Runs the pipeline on its own event loop in a daemon thread (used by the app)."""
+        def target():
+            try:
+                asyncio.run(self.run(jsonl, host, port, from_start))
+            except Exception as e:
+                with self._lock:
+                    self.last_error = f"Ingestion stopped: {e}"
+
+        self._thread = threading.Thread(target=target, name="ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self):
+        """{station: latest result}, most recently updated last."""
+        with self._lock:
+            return dict(self._latest)
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "received": self.counts["received"],
+                "rejected": self.counts["rejected"],
+                "suspect": self.counts["suspect"],
+                "predicted": self.counts["predicted"],
+                "failed": self.counts["failed"],
+                "batches": self.counts["batches"],
+                "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+                "queue_max": self.max_queue,
+                "queue_high_water": self.queue_high_water,
+                "backpressure_waits": self.counts["backpressure_waits"],
+                "backpressure_seconds": self.backpressure_seconds,
+                "stations": len(self._latest),
+                "last_error": self.last_error,
+                "last_suspect": self.last_suspect,
+            }
+
+
+async def tail_jsonl(pipeline, path, poll=0.2, from_start=True):
+    """Follows a JSONL file like ``tail -f``, starting over if it is truncated."""
+    position = 0
+    if not from_start and os.path.exists(path):
+        position = os.path.getsize(path)
+    pending = b""
+    while True:
+        try:
+            with open(path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size < position:
+                    position, pending = 0, b""
+                file.seek(position)
+                chunk = file.read(READ_CHUNK)
+        except FileNotFoundError:
+            chunk = b""
+        if not chunk:
+            await asyncio.sleep(poll)
+            continue
+        position += len(chunk)
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                await pipeline.submit(line)
+        if len(pending) > MAX_LINE_BYTES:
+            pipeline._reject(f"Line longer than {MAX_LINE_BYTES} bytes")
+            pending = b""
+
+
+async def serve_socket(pipeline, host="127.0.0.1", port=DEFAULT_PORT):
+    """Accepts newline-delimited JSON readings over TCP from any number of senders."""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line longer than the stream limit
+                    pipeline._reject(f"Line longer than {MAX_LINE_BYTES} bytes")
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await pipeline.submit(line)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, limit=MAX_LINE_BYTES)
+    async with server:
+        await server.serve_forever()
+
+
+# Simulator
+def replay_records(source, stations=1):
+    """Yields the dataset's rows as feed records, fanned out to ``stations`` copies per row."""
+    import pandas as pd
+
+    data = pd.read_csv(source, encoding='utf-8-sig')
+    days = pd.to_datetime(data['Date'], format=forecast.DATE_FORMAT).dt.strftime("%Y-%m-%d")
+    for (_, row), day in zip(data.iterrows(), days):
+        record = {"time": day}
+        for name in engine.FEATURES:
+            record[name] = None if pd.isna(row[name]) else float(row[name])
+        for index in range(stations):
+            station = row['City'] if stations == 1 else f"{row['City']}-{index + 1:03d}"
+            yield dict(record, station=station)
+
+
+def replay(source, jsonl=None, connect=None, rate=10.0, stations=1, loop=False):
+    """Replays the dataset into a JSONL file or TCP socket at ``rate`` readings/second (0 = unthrottled)."""
+    if connect:
+        host, port = connect.rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+        write = sock.sendall  # blocks while the pipeline applies backpressure
+        close = sock.close
+    else:
+        file = open(jsonl or DEFAULT_FEED, 'ab')
+
+        def write(data):
+            file.write(data)
+            file.flush()
+        close = file.close
+
+    sent = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            for record in replay_records(source, stations):
+                write((json.dumps(record) + "\n").encode())
+                sent += 1
+                if rate:
+                    delay = start + sent / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+            if not loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close()
+    return sent, time.perf_counter() - start
+
+
+async def _run_and_report(pipeline, args):
+    async def report():
+        while True:
+            await asyncio.sleep(args.report_every)
+            stats = pipeline.stats()
+            print(f"received {stats['received']:,}  predicted {stats['predicted']:,}  "
+                  f"rejected {stats['rejected']:,}  suspect {stats['suspect']:,}  queue {stats['queue_depth']:,}/{stats['queue_max']:,}  "
+                  f"backpressure {stats['backpressure_seconds']:.2f}s  stations {stats['stations']:,}", flush=True)
+
+    await asyncio.gather(pipeline.run(args.jsonl, args.host, args.port, not args.from_end), report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream sensor readings through the AQI model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_cmd = sub.add_parser("run", help="Ingest readings from a JSONL file and/or TCP socket")
+    run_cmd.add_argument("--jsonl", help="JSONL file to follow")
+    run_cmd.add_argument("--from-end", action="store_true", help="Skip lines already in the file")
+    run_cmd.add_argument("--host", default="127.0.0.1")
+    run_cmd.add_argument("--port", type=int, help=f"Accept readings over TCP (e.g. {DEFAULT_PORT})")
+    run_cmd.add_argument("--model", default=engine.DEFAULT_ARTIFACT,
+                         help="Model artifact or pickle (default: li.json, falling back to li.pkl)")
+    run_cmd.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE)
+    run_cmd.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    run_cmd.add_argument("--report-every", type=float, default=1.0)
+    run_cmd.add_argument("--no-screen", action="store_true", help="Predict readings without sensor-fault checks")
+    replay_cmd = sub.add_parser("replay", help="Replay a CSV as a live feed")
+    replay_cmd.add_argument("source")
+    replay_cmd.add_argument("--jsonl", default=DEFAULT_FEED, help=f"File to append to (default: {DEFAULT_FEED})")
+    replay_cmd.add_argument("--connect", help="host:port of `ingest.py run --port` instead of a file")
+    replay_cmd.add_argument("--rate", type=float, default=10.0, help="Readings per second, 0 for unthrottled")
+    replay_cmd.add_argument("--stations", type=int, default=1, help="Simulated stations per CSV row")
+    replay_cmd.add_argument("--loop", action="store_true", help="Start over at the end of the file")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        sent, seconds = replay(args.source, args.jsonl, args.connect, args.rate, args.stations, args.loop)
+        print(f"Sent {sent:,} readings in {seconds:.1f}s ({sent / max(seconds, 1e-9):,.0f}/s)")
+        return
+
+    if not args.jsonl and not args.port:
+        parser.error("run needs --jsonl and/or --port")
+    model = engine.load_model(args.model)
+    screen = None if args.no_screen else quality.StreamValidator()
+    pipeline = Pipeline(lambda: model, max_queue=args.max_queue, max_batch=args.max_batch, screen=screen)
+    try:
+        asyncio.run(_run_and_report(pipeline, args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives N simulated sessions of the real ``5.py`` headlessly with Streamlit's
+AppTest, all in one process so they share ``@st.cache_resource`` objects the
+way sessions of one server process do. Each session enters a pollutant row
+sampled from the dataset and clicks Predict.
+
+Two latencies are reported per concurrency level, with throughput, memory per
+session and the app's stage timings (metrics.py):
+
+    rerun     AppTest has no fragment-scoped reruns, so every click re-executes
+              the whole script. This is the cost of a full page rerun (what a
+              user pays when a sidebar setting changes), not of a click.
+    fragment  the prediction fragment's own body (readings, Predict, gauge and
+              what-if), timed inside the app ("fragment_prediction_section"). In
+              production a reading edit or Predict click reruns only this
+              fragment, so this is the click's server-side
+              script cost; Streamlit's rerun bookkeeping, the websocket and the
+              browser come on top. If it grows towards the rerun latency, work
+              has leaked into the fragment.
+
+Both are server-side numbers measured without a browser.
+
+Usage:
+    python loadtest.py [--concurrency 1,2,4,8,16] [--iterations 20] [--compare bench_results/loadtest-<commit>.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import bench
+import engine
+import metrics
+
+FEATURES = engine.FEATURES
+DEFAULT_SCRIPT = "5.py"
+DEFAULT_LEVELS = [1, 2, 4, 8, 16]
+# Input labels in 5.py start with the pollutant name
+INPUT_LABELS = {"PM2.5": "PM2.5 (", "PM10": "PM10 (", "NO2": "NO2 (", "SO2": "SO2 (", "CO": "CO (", "O3": "O3 ("}
+PREDICT_BUTTON = "Predict AQI"
+FRAGMENT_STAGE = "fragment_prediction_section"
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak rather than current RSS, but still grows with sessions
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def sample_inputs(n, data_path="Bangalore_AQI_Dataset.csv", seed=0):
+    """Rows drawn from the dataset with a little multiplicative noise, like fresh readings."""
+    rng = np.random.default_rng(seed)
+    data = pd.read_csv(data_path, encoding='utf-8-sig')[FEATURES].dropna().to_numpy(dtype=float)
+    rows = data[rng.integers(0, len(data), size=n)] * rng.normal(1.0, 0.05, size=(n, len(FEATURES)))
+    return np.round(np.abs(rows), 2)
+
+
+class Session:
+    """One simulated user: an AppTest of the script plus the widgets it uses."""
+
+    def __init__(self, script, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(script, default_timeout=timeout)
+
+    def open(self):
+        """Loads the page (the first full run) and returns its latency."""
+        start = time.perf_counter()
+        self.app.run()
+        seconds = time.perf_counter() - start
+        self._check()
+        return seconds
+
+    def predict(self, row):
+        """Enters one row of readings, clicks Predict and returns the rerun latency."""
+        for name, value in zip(FEATURES, row):
+            self._widget(self.app.number_input, INPUT_LABELS[name]).set_value(float(value))
+        button = self._widget(self.app.button, PREDICT_BUTTON)
+        start = time.perf_counter()
+        button.click().run()
+        seconds = time.perf_counter() - start
+        self._check()
+        return seconds
+
+    @staticmethod
+    def _widget(elements, label):
+        for element in elements:
+            if label in element.label:
+                return element
+        raise LookupError(f"No widget labelled {label!r}")
+
+    def _check(self):
+        if len(self.app.exception):
+            raise RuntimeError(f"Script raised: {self.app.exception[0].message}")
+
+
+def run_level(concurrency, iterations, inputs, script, timeout):
+    """Opens ``concurrency`` sessions, then has each click Predict ``iterations`` times at once."""
+    gc.collect()
+    baseline = rss_bytes()
+    sessions = [Session(script, timeout) for _ in range(concurrency)]
+    open_latencies = [session.open() for session in sessions]
+    gc.collect()
+    per_session = (rss_bytes() - baseline) / concurrency
+
+    metrics.REGISTRY.reset()
+    latencies = [[] for _ in sessions]
+    errors = []
+    barrier = threading.Barrier(concurrency)
+
+    def user(index):
+        barrier.wait()
+        for i in range(iterations):
+            row = inputs[(index * iterations + i) % len(inputs)]
+            try:
+                latencies[index].append(sessions[index].predict(row))
+            except Exception as e:
+                errors.append(str(e))
+                return
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    all_latencies = np.array([value for values in latencies for value in values])
+    result = {
+        "concurrency": concurrency,
+        "reruns": int(len(all_latencies)),
+        "errors": len(errors),
+        "wall_seconds": wall,
+        "throughput": len(all_latencies) / wall if wall > 0 else 0.0,
+        "open_p50": float(np.percentile(open_latencies, 50)),
+        "memory_per_session": per_session,
+        "stages": metrics.REGISTRY.snapshot(),
+    }
+    if len(all_latencies):
+        for q in (50, 95, 99):
+            result[f"p{q}"] = float(np.percentile(all_latencies, q))
+    fragment = result["stages"].get(FRAGMENT_STAGE)
+    if fragment:
+        result["fragment_p50"] = fragment["p50_ms"] / 1000
+        result["fragment_p99"] = fragment["p99_ms"] / 1000
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def as_bench_results(levels):
+    """Flattens level results into bench.py's {name: {"seconds": ...}} shape for ``bench.compare``."""
+    results = {}
+    for level in levels:
+        for q in ("p50", "p95", "p99", "fragment_p50", "fragment_p99"):
+            if q in level:
+                results[f"loadtest.c{level['concurrency']}.{q}"] = {"seconds": level[q]}
+        if level["throughput"]:
+            results[f"loadtest.c{level['concurrency']}.per_rerun"] = {"seconds": 1 / level["throughput"]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test 5.py with concurrent headless sessions.")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="Comma-separated session counts (default: 1,2,4,8,16)")
+    parser.add_argument("--iterations", type=int, default=20, help="Predict clicks per session per level")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a rerun counts as hung")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Results file (default: bench_results/loadtest-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier loadtest results file to compare against")
+    args = parser.parse_args()
+
+    # Streamlit warns about bare-mode contexts and deprecations on every run
+    warnings.simplefilter("ignore")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    levels = [int(value) for value in args.concurrency.split(",")]
+    inputs = sample_inputs(max(levels) * args.iterations, seed=args.seed)
+
+    # Warm the process-wide caches (model, forecaster, history store) outside the measurements
+    Session(args.script, args.timeout).open()
+
+    print("rerun = full script rerun per click (AppTest); fragment = the Predict fragment's own time")
+    print(f"{'sessions':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'frag p50':>9} {'frag p99':>9} {'open ms':>8} {'MiB/session':>12} {'errors':>7}")
+    results = []
+    for concurrency in levels:
+        level = run_level(concurrency, args.iterations, inputs, args.script, args.timeout)
+        results.append(level)
+        print(f"{concurrency:>8} {level['throughput']:>9.1f} {level.get('p50', 0) * 1000:>8.1f} "
+              f"{level.get('p95', 0) * 1000:>8.1f} {level.get('p99', 0) * 1000:>8.1f} "
+              f"{level.get('fragment_p50', 0) * 1000:>9.1f} {level.get('fragment_p99', 0) * 1000:>9.1f} "
+              f"{level['open_p50'] * 1000:>8.1f} {level['memory_per_session'] / 2 ** 20:>12.2f} "
+              f"{level['errors']:>7}", flush=True)
+        if level["errors"]:
+            print(f"  first error: {level['first_error']}")
+
+    slowest = results[-1]["stages"]
+    if slowest:
+        print(f"\nStage timings at {levels[-1]} sessions (metrics.py):")
+        width = max(len(stage) for stage in slowest)
+        for stage, summary in sorted(slowest.items(), key=lambda item: -item[1]["mean_ms"]):
+            print(f"  {stage:<{width}} n={summary['count']:<6} mean {summary['mean_ms']:8.2f} ms  "
+                  f"p99 {summary['p99_ms']:8.2f} ms")
+
+    commit = bench.git_commit()
+    out = args.out or os.path.join("bench_results", f"loadtest-{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, 'w') as file:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "levels": results,
+            "results": as_bench_results(results),
+        }, file, indent=2)
+    print(f"\nSaved results to {out}")
+
+    if args.compare:
+        bench.compare(as_bench_results(results), args.compare)
+
+
+if __name__ == "__main__":
+    main()
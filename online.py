@@ -0,0 +1,206 @@
+"""Online updates of the linear AQI model with recursive least squares (RLS).
+
+New labeled rows (same columns as Bangalore_AQI_Dataset.csv) are folded into
+the coefficients one at a time, in constant time and memory, with optional
+exponential forgetting so older data counts less. Checkpoints rewrite li.json
+atomically; the app notices the changed file and reloads the model without a
+restart. The RLS state itself (coefficients plus inverse covariance) is kept in
+li.rls.json next to it, together with a digest of the li.json it last wrote:
+if the model has been retrained since, the stale state is refused rather than
+written back over the new coefficients.
+
+The covariance always comes from real data (by default the training dataset),
+never from an uninformative prior, so the first few new rows nudge the shipped
+coefficients instead of replacing them.
+
+Usage:
+    python online.py init [--data Bangalore_AQI_Dataset.csv] [--refit]
+    python online.py update new_rows.csv [--forgetting 0.999] [--checkpoint-every 1000]
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import engine
+
+FEATURES = engine.FEATURES
+TARGET = 'AQI'
+DEFAULT_STATE = "li.rls.json"
+DEFAULT_DATA = "Bangalore_AQI_Dataset.csv"
+
+
+class RecursiveLeastSquares:
+    """Linear regression updated one row at a time.
+
+    ``theta`` holds the intercept followed by the coefficients; ``P`` is the
+    inverse of the (forgetting-weighted) Gram matrix.
+    """
+
+    def __init__(self, theta, P, forgetting=1.0, count=0, artifact_sha256=None):
+        self.theta = np.asarray(theta, dtype=float)
+        self.P = np.asarray(P, dtype=float)
+        self.forgetting = float(forgetting)
+        self.count = int(count)
+        self.artifact_sha256 = artifact_sha256  # digest of the li.json this state last wrote
+        if not 0 < self.forgetting <= 1:
+            raise ValueError("forgetting must be in (0, 1]")
+
+    @classmethod
+    def from_model(cls, model, X, forgetting=1.0):
+        """Keeps a fitted linear model's coefficients, with the covariance of the rows it was trained on."""
+        theta = np.concatenate([[model.intercept], model.coef])
+        X1 = np.column_stack([np.ones(len(X)), np.asarray(X, dtype=float)])
+        return cls(theta, np.linalg.pinv(X1.T @ X1), forgetting, count=len(X1))
+
+    @classmethod
+    def from_data(cls, X, y, forgetting=1.0):
+        """Starts from the exact least-squares solution on (X, y), as if every row had been folded in."""
+        X1 = np.column_stack([np.ones(len(X)), np.asarray(X, dtype=float)])
+        P = np.linalg.pinv(X1.T @ X1)
+        theta = P @ X1.T @ np.asarray(y, dtype=float)
+        return cls(theta, P, forgetting, count=len(X1))
+
+    def update(self, x, y):
+        """Folds in one row of concentrations ``x`` with observed AQI ``y``. Returns the prior error."""
+        x = np.concatenate([[1.0], np.asarray(x, dtype=float)])
+        Px = self.P @ x
+        gain = Px / (self.forgetting + x @ Px)
+        error = float(y) - self.theta @ x
+        self.theta = self.theta + gain * error
+        self.P = (self.P - np.outer(gain, Px)) / self.forgetting
+        # Keep P symmetric so rounding errors don't accumulate
+        self.P = (self.P + self.P.T) / 2
+        self.count += 1
+        return error
+
+    def update_many(self, X, y):
+        """Folds in rows in order; returns the mean absolute prior error."""
+        errors = [abs(self.update(x, target)) for x, target in zip(np.asarray(X, dtype=float), y)]
+        return float(np.mean(errors)) if errors else 0.0
+
+    def to_model(self):
+        return engine.LinearModel(self.theta[1:], self.theta[0], FEATURES)
+
+    def save(self, path=DEFAULT_STATE):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({
+                "theta": self.theta.tolist(),
+                "P": self.P.tolist(),
+                "forgetting": self.forgetting,
+                "count": self.count,
+                "artifact_sha256": self.artifact_sha256,
+            }, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE):
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["theta"], data["P"], data["forgetting"], data["count"], data.get("artifact_sha256"))
+
+
+def artifact_digest(path=engine.DEFAULT_ARTIFACT):
+    """SHA-256 of a model artifact's bytes, or None if it doesn't exist."""
+    try:
+        with open(path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def checkpoint(rls, artifact=engine.DEFAULT_ARTIFACT, state=DEFAULT_STATE):
+    """Atomically writes the model artifact the app loads, then the RLS state that matches it."""
+    rls.to_model().save(artifact)
+    rls.artifact_sha256 = artifact_digest(artifact)
+    rls.save(state)
+
+
+def read_training_data(path=DEFAULT_DATA):
+    import pandas as pd
+
+    return pd.read_csv(path, encoding='utf-8-sig').dropna(subset=FEATURES + [TARGET])
+
+
+def init_state(artifact=engine.DEFAULT_ARTIFACT, data=DEFAULT_DATA, refit=False):
+    """Fresh RLS state: the artifact's coefficients with the covariance of ``data``, or a refit on ``data``."""
+    rows = read_training_data(data)
+    if refit:
+        return RecursiveLeastSquares.from_data(rows[FEATURES], rows[TARGET])
+    model = engine.load_model(artifact)
+    if not isinstance(model, engine.LinearModel):
+        model = engine.LinearModel.from_estimator(model)
+    return RecursiveLeastSquares.from_model(model, rows[FEATURES])
+
+
+def load_or_init(state=DEFAULT_STATE, artifact=engine.DEFAULT_ARTIFACT, data=DEFAULT_DATA):
+    """Resumes from the saved RLS state if it still matches the artifact, else initialises from ``data``.
+
+    Raises ValueError if the artifact changed since the state was saved (e.g. after
+    train.py), so old coefficients are never written back over a retrained model.
+    """
+    if not os.path.exists(state):
+        return init_state(artifact, data)
+    rls = RecursiveLeastSquares.load(state)
+    if rls.artifact_sha256 != artifact_digest(artifact):
+        raise ValueError(f"{artifact} has changed since {state} was saved (retrained?); "
+                         f"run 'python online.py init' to start again from the current model")
+    return rls
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Update the linear AQI model online with RLS.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    init = sub.add_parser("init", help="Create the RLS state from the current model and its training data")
+    init.add_argument("--data", default=DEFAULT_DATA,
+                      help="Training data that seeds the covariance (default: Bangalore_AQI_Dataset.csv)")
+    init.add_argument("--refit", action="store_true",
+                      help="Also replace the coefficients with the exact least-squares fit on --data")
+    update = sub.add_parser("update", help="Fold new labeled rows into the model")
+    update.add_argument("data", help="CSV with AQI and pollutant columns")
+    update.add_argument("--checkpoint-every", type=int, default=10_000, help="Rows between checkpoints")
+    update.add_argument("--chunksize", type=int, default=100_000)
+    update.add_argument("--init-data", default=DEFAULT_DATA,
+                        help="Training data that seeds the covariance if there is no state yet")
+    for command in (init, update):
+        command.add_argument("--forgetting", type=float, help="Forgetting factor in (0, 1]; 1 keeps all history")
+        command.add_argument("--artifact", default=engine.DEFAULT_ARTIFACT)
+        command.add_argument("--state", default=DEFAULT_STATE)
+    args = parser.parse_args()
+
+    if args.command == "init":
+        rls = init_state(args.artifact, args.data, args.refit)
+        if args.forgetting is not None:
+            rls.forgetting = args.forgetting
+        checkpoint(rls, args.artifact, args.state)
+        print(f"Initialised RLS state in {args.state} ({rls.count} rows folded in)")
+        return
+
+    try:
+        rls = load_or_init(args.state, args.artifact, args.init_data)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.forgetting is not None:
+        rls.forgetting = args.forgetting
+    since_checkpoint = 0
+    for chunk in pd.read_csv(args.data, chunksize=args.chunksize, encoding='utf-8-sig'):
+        chunk = chunk.dropna(subset=FEATURES + [TARGET])
+        for start in range(0, len(chunk), args.checkpoint_every):
+            part = chunk.iloc[start:start + args.checkpoint_every]
+            error = rls.update_many(part[FEATURES].to_numpy(), part[TARGET].to_numpy())
+            since_checkpoint += len(part)
+            if since_checkpoint >= args.checkpoint_every:
+                checkpoint(rls, args.artifact, args.state)
+                since_checkpoint = 0
+                print(f"{rls.count} rows folded in, mean |error| before update {error:.3f}")
+    checkpoint(rls, args.artifact, args.state)
+    print(f"Done: {rls.count} rows folded in; coefficients written to {args.artifact}")
+
+
+if __name__ == "__main__":
+    main()
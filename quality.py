@@ -0,0 +1,260 @@
+"""Streaming sensor-fault and anomaly detection.
+
+Each station keeps only its last ``window`` readings, the last usable value
+and the current run length per pollutant, so memory per station is constant
+however long the stream runs. Readings are checked in batches (one per
+station) with cumulative sums, so each reading costs O(1) whether it arrives
+alone from the live feed or as one of millions in a historical dump. Every
+reading is checked against the station's own recent history before it is
+predicted:
+
+    missing       value absent or not a number
+    negative      below zero
+    out_of_range  above twice the top CPCB breakpoint (physically implausible)
+    flatline      the same value repeated ``flatline_run`` times in a row (stuck sensor)
+    spike         more than ``z_threshold`` rolling standard deviations from the rolling mean
+    jump          changed by more than ``jump_sigmas`` standard deviations since the last reading
+    duplicate     same timestamp as the station's previous reading
+
+Real pollution episodes move several pollutants at once, so spikes and jumps
+seen in ``corroborate`` or more pollutants of the same reading are not flagged.
+
+``scan`` runs the same checks over a historical dump in one chunked pass.
+
+Usage:
+    python quality.py scan Bangalore_AQI_Dataset.csv [--out suspect_rows.csv] [--by City] [--window 30]
+"""
+import argparse
+import csv
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+import aqi_index
+import engine
+
+FEATURES = engine.FEATURES
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_WINDOW = 30
+DEFAULT_MIN_PERIODS = 10
+DEFAULT_Z = 4.0
+DEFAULT_JUMP_SIGMAS = 5.0
+DEFAULT_FLATLINE_RUN = 8
+DEFAULT_CORROBORATE = 3
+MAX_STATIONS = 10_000
+FLAGS = ("missing", "negative", "out_of_range", "flatline", "spike", "jump", "duplicate")
+
+# Anything above twice the top of the Severe band is treated as a sensor fault
+PLAUSIBLE_MAX = 2 * aqi_index.CONCENTRATION_BREAKPOINTS[:, -1]
+
+Verdict = namedtuple("Verdict", "ok flags")  # flags: [(pollutant or None, flag), ...]
+
+
+class StationState:
+    """What a station's checks carry from one batch to the next."""
+
+    def __init__(self, window=DEFAULT_WINDOW, n_features=len(FEATURES)):
+        self.window = np.full((window, n_features), np.nan)  # usable values, oldest first
+        self.last = np.full(n_features, np.nan)
+        self.run = np.zeros(n_features)
+        self.last_time = None
+
+
+def _forward_fill(values, start):
+    """Each row's most recent finite value strictly before it, starting from ``start``."""
+    filled = np.vstack([start, values])
+    index = np.where(np.isfinite(filled), np.arange(len(filled))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(filled, index, axis=0)
+    return filled[:-1], filled[-1]
+
+
+def _run_lengths(same, usable, start):
+    """Run length of repeated values at each row; rows that aren't usable carry the run over."""
+    # Count usable rows so far, and remember where the latest run restarted
+    seen = np.cumsum(usable, axis=0)
+    restart = np.where(usable & ~same, seen, 0)
+    np.maximum.accumulate(restart, axis=0, out=restart)
+    run = np.where(restart > 0, seen - restart + 1, start + seen)
+    # Before the first usable row the previous batch's run still stands
+    return np.where(seen > 0, run, start)
+
+
+class StreamValidator:
+    """Flags suspect readings per station using constant-memory rolling statistics."""
+
+    def __init__(self, window=DEFAULT_WINDOW, min_periods=DEFAULT_MIN_PERIODS, z_threshold=DEFAULT_Z,
+                 jump_sigmas=DEFAULT_JUMP_SIGMAS, flatline_run=DEFAULT_FLATLINE_RUN,
+                 corroborate=DEFAULT_CORROBORATE, max_values=PLAUSIBLE_MAX, features=FEATURES,
+                 max_stations=MAX_STATIONS):
+        self.window = window
+        self.min_periods = min_periods
+        self.z_threshold = z_threshold
+        self.jump_sigmas = jump_sigmas
+        self.flatline_run = flatline_run
+        self.corroborate = corroborate
+        self.max_values = np.asarray(max_values, dtype=float)
+        self.features = list(features)
+        self.max_stations = max_stations
+        self._lock = threading.Lock()
+        self._stations = OrderedDict()
+        self.counts = Counter()
+
+    def _state(self, station):
+        state = self._stations.get(station)
+        if state is None:
+            state = self._stations[station] = StationState(self.window, len(self.features))
+            while len(self._stations) > self.max_stations:
+                self._stations.popitem(last=False)
+        else:
+            self._stations.move_to_end(station)
+        return state
+
+    def check(self, station, values, when=None):
+        """Checks one reading (values in feature order) and folds it into the station's history."""
+        return self.check_many(station, [values], None if when is None else [when])[0]
+
+    def check_many(self, station, values, times=None):
+        """Checks consecutive readings of one station, oldest first. Returns one Verdict per reading."""
+        X = np.asarray(values, dtype=float).reshape(-1, len(self.features))
+        n = len(X)
+        with self._lock:
+            state = self._state(station)
+            finite = np.isfinite(X)
+            negative = finite & (X < 0)
+            out_of_range = finite & (X > self.max_values)
+            usable = finite & ~negative & ~out_of_range
+            usable_values = np.where(usable, X, np.nan)
+
+            # Rolling count/sum/sum of squares over the ``window`` readings before each row
+            history = np.vstack([state.window, usable_values])
+            present = np.isfinite(history)
+            clean = np.where(present, history, 0.0)
+            sums = [np.vstack([np.zeros(len(self.features)), np.cumsum(a, axis=0)])
+                    for a in (present.astype(float), clean, clean * clean)]
+            count, total, squares = (c[self.window:self.window + n] - c[:n] for c in sums)
+            mean = total / np.maximum(count, 1)
+            std = np.sqrt(np.maximum(squares - total * mean, 0.0) / np.maximum(count - 1, 1))
+
+            ready = usable & (count >= self.min_periods) & (std > 0)
+            safe_std = np.where(std > 0, std, 1.0)
+            spike = ready & (np.abs(X - mean) > self.z_threshold * safe_std)
+            last, state.last = _forward_fill(usable_values, state.last)
+            step = np.abs(X - last)
+            jump = ready & np.isfinite(last) & (step > self.jump_sigmas * safe_std)
+            # Several pollutants moving together is a pollution episode, not a faulty sensor
+            episode = (spike | jump).sum(axis=1, keepdims=True) >= self.corroborate
+            spike &= ~episode
+            jump &= ~episode
+            run = _run_lengths(step == 0, usable, state.run)
+            state.run = run[-1]
+            flatline = usable & (run >= self.flatline_run)
+
+            if times is not None:
+                times = list(times)
+                duplicate = np.array([when is not None and when == previous
+                                      for when, previous in zip(times, [state.last_time] + times[:-1])])
+                state.last_time = times[-1]
+            else:
+                duplicate = np.zeros(n, dtype=bool)
+            state.window = history[-self.window:]
+
+            masks = (~finite, negative, out_of_range, flatline, spike, jump)
+            suspect = np.logical_or.reduce([mask.any(axis=1) for mask in masks]) | duplicate
+            verdicts = [Verdict(True, [])] * n
+            for i in np.flatnonzero(suspect):
+                flags = [(self.features[j], name) for name, mask in zip(FLAGS, masks)
+                         for j in np.flatnonzero(mask[i])]
+                if duplicate[i]:
+                    flags.append((None, "duplicate"))
+                verdicts[i] = Verdict(False, flags)
+                self.counts.update(flag for _, flag in flags)
+            self.counts["readings"] += n
+            self.counts["suspect"] += int(suspect.sum())
+        return verdicts
+
+    def stats(self):
+        with self._lock:
+            return {"stations": len(self._stations), **self.counts}
+
+
+def format_flags(flags):
+    """'PM2.5:spike;CO:flatline' for logs and CSV output."""
+    return ";".join(flag if pollutant is None else f"{pollutant}:{flag}" for pollutant, flag in flags)
+
+
+def scan(source, output=None, by="City", time_column="Date", chunksize=DEFAULT_CHUNKSIZE,
+         validator=None, progress=None):
+    """Checks every row of a historical dump in one chunked pass, in file order.
+
+    Suspect rows are written to the CSV ``output`` (row number, station, time, flags).
+    Returns the validator's counts plus throughput.
+    """
+    validator = validator or StreamValidator()
+    writer = csv.writer(output) if output is not None else None
+    if writer is not None:
+        writer.writerow(["row", "station", "time", "flags"])
+    rows = 0
+    start = time.perf_counter()
+    for chunk in pd.read_csv(source, chunksize=chunksize, encoding='utf-8-sig'):
+        missing = [name for name in FEATURES if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing pollutant columns: {', '.join(missing)}")
+        values = chunk[FEATURES].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        stations = chunk[by].astype(str).to_numpy() if by in chunk.columns else np.full(len(chunk), "default")
+        times = chunk[time_column].to_numpy() if time_column in chunk.columns else None
+        # Each station's rows keep their file order, so grouping within a chunk changes nothing
+        suspect = []
+        for station, index in pd.Series(np.arange(len(chunk))).groupby(stations, sort=False):
+            index = index.to_numpy()
+            verdicts = validator.check_many(station, values[index], None if times is None else times[index])
+            suspect.extend((i, station, verdict) for i, verdict in zip(index, verdicts) if not verdict.ok)
+        if writer is not None:
+            for i, station, verdict in sorted(suspect, key=lambda item: item[0]):
+                writer.writerow([rows + i + 1, station, None if times is None else times[i],
+                                 format_flags(verdict.flags)])
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows)
+    seconds = time.perf_counter() - start
+    return {**validator.stats(), "rows": rows, "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag suspect sensor readings in a station export.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_cmd = sub.add_parser("scan", help="Check a CSV dump in one pass")
+    scan_cmd.add_argument("source")
+    scan_cmd.add_argument("--out", help="Write suspect rows to this CSV")
+    scan_cmd.add_argument("--by", default="City", help="Column naming the station (default: City)")
+    scan_cmd.add_argument("--time-column", default="Date")
+    scan_cmd.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    scan_cmd.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Readings in the rolling window")
+    scan_cmd.add_argument("--z", type=float, default=DEFAULT_Z, help="Spike threshold in standard deviations")
+    scan_cmd.add_argument("--jump-sigmas", type=float, default=DEFAULT_JUMP_SIGMAS)
+    scan_cmd.add_argument("--flatline-run", type=int, default=DEFAULT_FLATLINE_RUN)
+    scan_cmd.add_argument("--corroborate", type=int, default=DEFAULT_CORROBORATE,
+                          help="Pollutants spiking together that count as a real episode")
+    args = parser.parse_args()
+
+    validator = StreamValidator(window=args.window, z_threshold=args.z, jump_sigmas=args.jump_sigmas,
+                                flatline_run=args.flatline_run, corroborate=args.corroborate)
+    if args.out:
+        with open(args.out, 'w', newline='') as out:
+            stats = scan(args.source, out, args.by, args.time_column, args.chunksize, validator)
+    else:
+        stats = scan(args.source, None, args.by, args.time_column, args.chunksize, validator)
+    print(f"Checked {stats['rows']:,} rows from {stats['stations']:,} stations in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/s)")
+    print(f"Suspect readings: {stats.get('suspect', 0):,}")
+    for flag in FLAGS:
+        if stats.get(flag):
+            print(f"  {flag:<13} {stats[flag]:,}")
+
+
+if __name__ == "__main__":
+    main()
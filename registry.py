@@ -0,0 +1,189 @@
+"""Per-city / per-station model registry with lazy loading and LRU eviction.
+
+Models live in ``models/`` as ``<location>.json`` (NumPy engine artifact) or
+``<location>.pkl``, where ``<location>`` is the name made file-safe; an
+artifact records the original name in its ``metadata`` so the app can show it.
+The original ``li.json``/``li.pkl`` serve the default location (Bangalore, the
+city it was trained on). A model is loaded the first
+time its location is requested and kept in a memory-bounded LRU, so one
+process can host hundreds of station models without loading them all at startup.
+
+Usage:
+    python registry.py build Bangalore_AQI_Dataset.csv [--by City] [--models-dir models]
+    python registry.py list
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import cache
+import engine
+import metrics
+
+DEFAULT_MODELS_DIR = "models"
+DEFAULT_LOCATION = "Bangalore"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+MODEL_SUFFIXES = (".json", ".pkl")
+
+
+def location_filename(location):
+    """Turns a location name into a safe file stem ('Bengaluru / Peenya' -> 'Bengaluru_Peenya')."""
+    return re.sub(r"[^\w.-]+", "_", location.strip()).strip("_")
+
+
+class ModelRegistry:
+    """Loads location models on first use and evicts the least recently used past ``max_bytes``.
+
+    Memory per engine model is measured from its NumPy arrays. Pickled models
+    can't be measured cheaply, so their size on disk stands in, which
+    undercounts estimators that hold many small Python objects.
+    """
+
+    def __init__(self, models_dir=DEFAULT_MODELS_DIR, max_bytes=DEFAULT_MAX_BYTES, defaults=None):
+        self.models_dir = models_dir
+        self.max_bytes = max_bytes
+        if defaults is None:
+            defaults = {DEFAULT_LOCATION: (engine.DEFAULT_ARTIFACT, engine.DEFAULT_PICKLE)}
+        self.defaults = dict(defaults)
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()  # location -> (model, signature, bytes)
+        self._names = {}  # file name -> (signature, display name)
+        self.loads = 0
+        self.evictions = 0
+
+    def locations(self):
+        """All locations with a model by display name, defaults first."""
+        found = set()
+        if os.path.isdir(self.models_dir):
+            for name in os.listdir(self.models_dir):
+                stem, suffix = os.path.splitext(name)
+                if suffix == ".json":
+                    found.add(self._display_name(name, stem))
+                elif suffix in MODEL_SUFFIXES and not os.path.exists(os.path.join(self.models_dir, stem + ".json")):
+                    found.add(stem)
+        defaults = list(self.defaults)
+        return defaults + sorted(found - set(defaults))
+
+    def _display_name(self, name, stem):
+        """The location recorded in an artifact's metadata, else its file stem; re-read only when the file changes."""
+        path = os.path.join(self.models_dir, name)
+        signature = cache.model_signature((path,))
+        cached = self._names.get(name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            with open(path) as file:
+                location = str(json.load(file).get("metadata", {}).get("location") or stem)
+        except (OSError, ValueError, AttributeError):
+            location = stem
+        if location_filename(location) != stem:  # renamed file; paths() couldn't find it by this name
+            location = stem
+        self._names[name] = (signature, location)
+        return location
+
+    def paths(self, location):
+        """The (artifact, pickle) files for a location, preferring models/ over the defaults."""
+        stem = os.path.join(self.models_dir, location_filename(location))
+        if any(os.path.exists(stem + suffix) for suffix in MODEL_SUFFIXES):
+            return stem + ".json", stem + ".pkl"
+        if location in self.defaults:
+            return self.defaults[location]
+        raise FileNotFoundError(f"No model for location {location!r} in {self.models_dir}/")
+
+    def signature(self, location):
+        """Identifies the location's model files; changes when they are replaced."""
+        return cache.model_signature(self.paths(location))
+
+    def get(self, location):
+        """Returns the model for ``location``, loading (or reloading) it if needed."""
+        paths = self.paths(location)
+        signature = cache.model_signature(paths)
+        with self._lock:
+            entry = self._loaded.get(location)
+            if entry is not None and entry[1] == signature:
+                self._loaded.move_to_end(location)
+                return entry[0]
+
+        artifact, fallback = paths
+        with metrics.span("load_model"):
+            model = engine.load_model(artifact, fallback=fallback)
+        size = max(model_bytes(model, signature), 1)
+
+        with self._lock:
+            self._loaded[location] = (model, signature, size)
+            self._loaded.move_to_end(location)
+            self.loads += 1
+            while len(self._loaded) > 1 and self.loaded_bytes() > self.max_bytes:
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def loaded_bytes(self):
+        return sum(size for _, _, size in self._loaded.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._loaded),
+                "loaded_bytes": self.loaded_bytes(),
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def model_bytes(model, signature):
+    """Memory held by an engine model's arrays; the files' size on disk for anything else."""
+    if isinstance(model, tuple(engine.KINDS.values())):
+        return sum(value.nbytes for value in vars(model).values() if isinstance(value, np.ndarray))
+    return sum(size for _, _, size in signature)
+
+
+def build(source, models_dir=DEFAULT_MODELS_DIR, by="City", min_rows=30):
+    """Fits one least-squares model per location in a CSV and writes them as engine artifacts."""
+    import pandas as pd
+
+    data = pd.read_csv(source, encoding='utf-8-sig').dropna(subset=engine.FEATURES + ['AQI', by])
+    os.makedirs(models_dir, exist_ok=True)
+    written = {}
+    for location, group in data.groupby(by):
+        if len(group) < min_rows:
+            continue
+        X = np.column_stack([np.ones(len(group)), group[engine.FEATURES].to_numpy(dtype=float)])
+        theta = np.linalg.lstsq(X, group['AQI'].to_numpy(dtype=float), rcond=None)[0]
+        path = os.path.join(models_dir, location_filename(str(location)) + ".json")
+        engine.LinearModel(theta[1:], theta[0], metadata={"location": str(location)}).save(path)
+        written[str(location)] = len(group)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and list per-location AQI models.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Fit one model per city/station in a CSV")
+    build_cmd.add_argument("source")
+    build_cmd.add_argument("--by", default="City", help="Column naming the location (default: City)")
+    build_cmd.add_argument("--min-rows", type=int, default=30)
+    list_cmd = sub.add_parser("list", help="List locations with a model")
+    for command in (build_cmd, list_cmd):
+        command.add_argument("--models-dir", default=DEFAULT_MODELS_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        written = build(args.source, args.models_dir, args.by, args.min_rows)
+        for location, rows in written.items():
+            print(f"{location}: fitted on {rows} rows")
+        print(f"Wrote {len(written)} models to {args.models_dir}/")
+    else:
+        registry = ModelRegistry(args.models_dir)
+        for location in registry.locations():
+            print(location)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Materialized monthly, seasonal and yearly rollups of the daily history.
+
+Each bucket keeps additive totals (days, non-missing count and sum per column,
+days per AQI category), so a trend view reads a few hundred numbers instead
+of rescanning every daily row, and appending new days only adds into the
+buckets those days fall in. Means are derived on read. Readings are first
+averaged per city and calendar day, across stations and any intra-day
+readings, so a bucket counts days however the store is partitioned and a
+day's category comes from its mean AQI. Seasons follow the
+forecaster's (winter is December to February, counted in the year its
+January falls in).
+
+    history_store/rollups.json
+
+Usage:
+    python rollups.py build [--store history_store]
+    python rollups.py show Bangalore [--grain month|season|year] [--column AQI]
+    python rollups.py append new_days.csv [--city Bangalore]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import aqi_index
+import forecast
+import history
+
+DEFAULT_PATH = os.path.join(history.DEFAULT_STORE, "rollups.json")
+GRAINS = ("month", "season", "year")
+COLUMNS = history.VALUE_COLUMNS
+CATEGORIES = [str(name) for name in aqi_index.CATEGORY_NAMES]
+SEASONS = forecast.SEASONS
+MONTH_SEASON = np.array(forecast.MONTH_SEASON)
+# Bumped when bucket contents change meaning (2: readings averaged per city and day first)
+FORMAT = 2
+
+
+def _bucket_keys(times):
+    """{grain: bucket label per row} for datetime64 timestamps."""
+    months = times.astype('datetime64[M]').astype(np.int64)
+    year = months // 12 + 1970
+    month = months % 12
+    season = MONTH_SEASON[month]
+    # December opens the next year's winter
+    season_year = year + ((month == 11) & (season == 0))
+    return {
+        "month": np.char.add(np.char.add(year.astype(str), "-"), np.char.zfill((month + 1).astype(str), 2)),
+        "season": np.char.add(np.char.add(season_year.astype(str), " "), np.array(SEASONS)[season]),
+        "year": year.astype(str),
+    }
+
+
+def _sort_key(grain, key):
+    if grain == "season":
+        year, season = key.split(" ", 1)
+        return int(year), SEASONS.index(season)
+    return key
+
+
+def daily_means(times, values):
+    """Averages readings per calendar day. Returns (days as datetime64[s], means), oldest first.
+
+    ``values`` is (n, len(COLUMNS)) in COLUMNS order; a column missing on every
+    reading of a day stays NaN.
+    """
+    days, inverse = np.unique(np.asarray(times).astype('datetime64[D]'), return_inverse=True)
+    values = np.asarray(values, dtype=float).reshape(len(inverse), len(COLUMNS))
+    present = np.isfinite(values)
+    counts = np.zeros((len(days), len(COLUMNS)))
+    sums = np.zeros((len(days), len(COLUMNS)))
+    np.add.at(counts, inverse, present)
+    np.add.at(sums, inverse, np.where(present, values, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return days.astype('datetime64[s]'), means
+
+
+def aggregate(times, values):
+    """Rolls daily rows (one per day, see daily_means) up into {grain: {label: bucket}}.
+
+    ``values`` is (n, len(COLUMNS)) in COLUMNS order; the AQI column decides the category.
+    """
+    times = np.asarray(times).astype('datetime64[s]')
+    values = np.asarray(values, dtype=float).reshape(len(times), len(COLUMNS))
+    present = np.isfinite(values)
+    clean = np.where(present, values, 0.0)
+    aqi = values[:, COLUMNS.index('AQI')]
+    categories = aqi_index.category_index(aqi)
+
+    result = {}
+    for grain, keys in _bucket_keys(times).items():
+        labels, inverse = np.unique(keys, return_inverse=True)
+        n = len(labels)
+        days = np.bincount(inverse, minlength=n)
+        counts = np.zeros((n, len(COLUMNS)))
+        sums = np.zeros((n, len(COLUMNS)))
+        np.add.at(counts, inverse, present)
+        np.add.at(sums, inverse, clean)
+        category_days = np.bincount(inverse * len(CATEGORIES) + categories,
+                                    minlength=n * len(CATEGORIES)).reshape(n, len(CATEGORIES))
+        result[grain] = {
+            str(label): {
+                "days": int(days[i]),
+                "count": counts[i].astype(int).tolist(),
+                "sum": sums[i].tolist(),
+                "categories": category_days[i].tolist(),
+            }
+            for i, label in enumerate(labels)
+        }
+    return result
+
+
+def _merge(buckets, new):
+    """Adds ``new`` buckets into ``buckets`` in place; returns the labels touched."""
+    touched = []
+    for label, bucket in new.items():
+        old = buckets.get(label)
+        if old is None:
+            buckets[label] = bucket
+        else:
+            old["days"] += bucket["days"]
+            for field in ("count", "sum", "categories"):
+                old[field] = [a + b for a, b in zip(old[field], bucket[field])]
+        touched.append(label)
+    return touched
+
+
+class Rollups:
+    """Per-city rollups that can be read instantly and extended day by day."""
+
+    def __init__(self, cities=None, source_rows=0):
+        self.cities = cities or {}  # city: {"last": seconds, "buckets": {grain: {label: bucket}}}
+        self.source_rows = source_rows
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, store):
+        """Computes every rollup from a HistoryStore in one pass per city (all its stations)."""
+        rollups = cls(source_rows=sum(part["rows"] for part in store.manifest["partitions"]))
+        for city in store.cities():
+            first, last = store.date_range(city)
+            data = store.query(city, first, last, COLUMNS)
+            days, means = daily_means(data["time"], np.column_stack([data[column] for column in COLUMNS]))
+            rollups.cities[city] = {
+                "last": int(days[-1].astype(np.int64)),
+                "buckets": aggregate(days, means),
+            }
+        return rollups
+
+    def append(self, city, times, values):
+        """Folds new readings (all after the city's last day) into their buckets.
+
+        The readings are averaged per day first, like ``build``, so appending
+        every station's rows for new days gives the same buckets as a rebuild.
+        Returns {grain: [labels updated]}; nothing else is recomputed.
+        """
+        times = np.atleast_1d(np.asarray(times).astype('datetime64[s]'))
+        days, means = daily_means(times, values)
+        seconds = days.astype(np.int64)
+        with self._lock:
+            entry = self.cities.setdefault(city, {"last": None, "buckets": {grain: {} for grain in GRAINS}})
+            if entry["last"] is not None and seconds[0] <= entry["last"]:
+                last = np.datetime64(entry["last"], 's').astype('datetime64[D]')
+                raise ValueError(f"Days must be appended in date order (last was {last})")
+            new = aggregate(days, means)
+            touched = {grain: _merge(entry["buckets"][grain], new[grain]) for grain in GRAINS}
+            entry["last"] = int(seconds[-1])
+        return touched
+
+    def table(self, city, grain="month"):
+        """One row per bucket, oldest first: days, mean of each column and days per category."""
+        import pandas as pd
+
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain {grain!r}; expected one of {', '.join(GRAINS)}")
+        with self._lock:
+            if city not in self.cities:
+                raise KeyError(f"No rollups for city {city!r}")
+            buckets = self.cities[city]["buckets"][grain]
+            labels = sorted(buckets, key=lambda label: _sort_key(grain, label))
+            counts = np.array([buckets[label]["count"] for label in labels], dtype=float).reshape(-1, len(COLUMNS))
+            sums = np.array([buckets[label]["sum"] for label in labels], dtype=float).reshape(-1, len(COLUMNS))
+            categories = np.array([buckets[label]["categories"] for label in labels]).reshape(-1, len(CATEGORIES))
+            days = [buckets[label]["days"] for label in labels]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        frame = pd.DataFrame(means, index=pd.Index(labels, name=grain), columns=COLUMNS)
+        frame.insert(0, "days", days)
+        return frame.join(pd.DataFrame(categories, index=frame.index, columns=CATEGORIES))
+
+    def to_dict(self):
+        return {"format": FORMAT, "columns": COLUMNS, "categories": CATEGORIES, "source_rows": self.source_rows,
+                "cities": self.cities}
+
+    def save(self, path=DEFAULT_PATH):
+        """Writes the rollups atomically."""
+        with self._lock:
+            text = json.dumps(self.to_dict())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("columns") != COLUMNS or data.get("categories") != CATEGORIES:
+            raise ValueError(f"{path} was built with different columns or categories; rebuild it")
+        if data.get("format") != FORMAT:
+            raise ValueError(f"{path} was built by an older version; rebuild it")
+        return cls(data["cities"], data.get("source_rows", 0))
+
+
+def open_rollups(store, path=DEFAULT_PATH):
+    """Loads saved rollups, rebuilding them if missing or built from a different store."""
+    rows = sum(part["rows"] for part in store.manifest["partitions"])
+    try:
+        rollups = Rollups.load(path)
+        if rollups.source_rows == rows:
+            return rollups
+    except (OSError, ValueError, KeyError):
+        pass
+    rollups = Rollups.build(store)
+    rollups.save(path)
+    return rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, extend and show historical AQI rollups.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Compute every rollup from the history store")
+    show = sub.add_parser("show", help="Print one city's rollup table")
+    show.add_argument("city")
+    show.add_argument("--grain", default="month", choices=GRAINS)
+    show.add_argument("--column", default="AQI", choices=COLUMNS)
+    append = sub.add_parser("append", help="Fold new days from a CSV (dataset columns, any stations) into the rollups")
+    append.add_argument("source")
+    append.add_argument("--city", help="City for rows without a City column (default: Unknown)")
+    append.add_argument("--date-format", default=history.DATE_FORMAT)
+    for command in sub.choices.values():
+        command.add_argument("--store", default=history.DEFAULT_STORE)
+        command.add_argument("--path", help="Rollups file (default: <store>/rollups.json)")
+    args = parser.parse_args()
+    path = args.path or os.path.join(args.store, "rollups.json")
+
+    if args.command == "build":
+        start = time.perf_counter()
+        rollups = Rollups.build(history.HistoryStore(args.store))
+        rollups.save(path)
+        buckets = sum(len(entry["buckets"][grain]) for entry in rollups.cities.values() for grain in GRAINS)
+        print(f"Rolled {rollups.source_rows:,} rows into {buckets:,} buckets for {len(rollups.cities)} cities "
+              f"in {time.perf_counter() - start:.2f}s ({path})")
+        return
+
+    import pandas as pd
+
+    rollups = open_rollups(history.HistoryStore(args.store), path)
+    if args.command == "show":
+        start = time.perf_counter()
+        table = rollups.table(args.city, args.grain)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(table[["days", args.column] + CATEGORIES].round(1).to_string())
+        print(f"{len(table)} {args.grain} buckets in {elapsed_ms:.2f} ms")
+        return
+
+    data = pd.read_csv(args.source, encoding='utf-8-sig')
+    data['Date'] = pd.to_datetime(data['Date'], format=args.date_format)
+    if 'City' not in data.columns:
+        data['City'] = args.city or history.DEFAULT_CITY
+    for column in COLUMNS:
+        data[column] = pd.to_numeric(data[column], errors='coerce') if column in data else np.nan
+    for city, rows in data.sort_values('Date').groupby('City', sort=False):
+        touched = rollups.append(str(city), rows['Date'].to_numpy(dtype='datetime64[s]'),
+                                 rows[COLUMNS].to_numpy(dtype=float))
+        print(f"{city}: {len(rows)} days into " + ", ".join(f"{len(labels)} {grain}" for grain, labels in touched.items())
+              + " buckets")
+    rollups.save(path)
+
+
+if __name__ == "__main__":
+    main()
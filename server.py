@@ -0,0 +1,225 @@
+"""Headless HTTP prediction service for the AQI model.
+
+Endpoints:
+    POST /predict        {"PM2.5": 37.4, "PM10": 73.4, ...} or {"features": [6 values]}
+    POST /predict/batch  {"rows": [row, row, ...]} with rows in either form above
+    GET  /stats          latency percentiles and micro-batch sizes
+    GET  /metrics        stage timings in the Prometheus text format
+    GET  /health
+
+Concurrent /predict requests are collected for a few milliseconds and sent
+through ``predict`` as a single batch.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8600] [--model li.json] [--window-ms 2]
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import aqi_index
+import engine
+import metrics
+
+FEATURES = engine.FEATURES
+# Pending connections the kernel queues before accepting; the stdlib default of 5
+# resets connections as soon as a few dozen clients connect at once
+REQUEST_BACKLOG = 128
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_BACKLOG
+
+
+class LatencyStats:
+    """Keeps the most recent request latencies and batch sizes for percentile reporting."""
+
+    def __init__(self, maxlen=10_000):
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=maxlen)
+        self.batch_sizes = deque(maxlen=maxlen)
+        self.requests = 0
+        self.batches = 0
+
+    def record_latency(self, ms):
+        with self._lock:
+            self.latencies_ms.append(ms)
+            self.requests += 1
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batch_sizes.append(size)
+            self.batches += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self.latencies_ms)
+            sizes = np.array(self.batch_sizes)
+            requests, batches = self.requests, self.batches
+        result = {"requests": requests, "batches": batches}
+        if len(latencies):
+            result["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            }
+        if len(sizes):
+            result["batch_size"] = {
+                "mean": float(sizes.mean()),
+                "p50": float(np.percentile(sizes, 50)),
+                "max": int(sizes.max()),
+            }
+        return result
+
+
+class MicroBatcher:
+    """Collects single-row requests over a short window and predicts them in one call."""
+
+    def __init__(self, model, window_ms=2.0, max_batch=1024, stats=None):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.stats = stats
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queues one row and returns a Future resolving to its predicted AQI."""
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            rows = np.array([features for features, _ in pending], dtype=float)
+            try:
+                with metrics.span("server_batch_predict"):
+                    predictions = self.model.predict(rows)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            if self.stats is not None:
+                self.stats.record_batch(len(pending))
+            for (_, future), value in zip(pending, predictions):
+                future.set_result(float(value))
+
+
+def make_handler(model, batcher, stats):
+    """Builds the request handler class bound to a model and batcher."""
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send_json(200, stats.snapshot())
+            elif self.path == "/metrics":
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            try:
+                payload = self._read_json()
+                if self.path == "/predict":
+                    aqi = batcher.submit(engine.parse_row(payload)).result()
+                    result = {"aqi": aqi, "category": str(aqi_index.categorize([aqi])[0])}
+                elif self.path == "/predict/batch":
+                    if not isinstance(payload, dict):
+                        raise ValueError('Expected a JSON object like {"rows": [...]}')
+                    rows = np.array([engine.parse_row(row) for row in payload.get("rows", [])], dtype=float)
+                    aqi = model.predict(rows) if len(rows) else np.empty(0)
+                    result = {"aqi": aqi.tolist(), "category": aqi_index.categorize(aqi).tolist()}
+                else:
+                    self._send_json(404, {"error": "Not found"})
+                    return
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send_json(500, {"error": f"Prediction failed: {e}"})
+                return
+            elapsed = time.perf_counter() - start
+            stats.record_latency(elapsed * 1000)
+            metrics.REGISTRY.observe(f"server_{self.path.strip('/').replace('/', '_')}", elapsed)
+            self._send_json(200, result)
+
+    return PredictionHandler
+
+
+def make_server(model, host="127.0.0.1", port=8600, window_ms=2.0, max_batch=1024):
+    """Creates (but does not start) the prediction server."""
+    stats = LatencyStats()
+    batcher = MicroBatcher(model, window_ms=window_ms, max_batch=max_batch, stats=stats)
+    server = PredictionServer((host, port), make_handler(model, batcher, stats))
+    server.stats = stats
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve AQI predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--model", default=engine.DEFAULT_ARTIFACT,
+                        help="Model artifact or pickle (default: li.json, falling back to li.pkl)")
+    parser.add_argument("--window-ms", type=float, default=2.0,
+                        help="How long to collect single-row requests into one batch (default: 2)")
+    parser.add_argument("--max-batch", type=int, default=1024)
+    args = parser.parse_args()
+
+    server = make_server(engine.load_model(args.model), args.host, args.port,
+                         args.window_ms, args.max_batch)
+    print(f"Serving AQI predictions on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
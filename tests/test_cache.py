@@ -0,0 +1,30 @@
+import numpy as np
+
+import cache
+
+
+class Constant:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def predict(self, rows):
+        self.calls += 1
+        return np.full(len(rows), self.value)
+
+
+def test_new_version_purges_only_its_namespace(tmp_path):
+    predictions = cache.PredictionCache(model_paths=(str(tmp_path / "li.json"),))
+    row = [[30, 60, 20, 5, 1, 40]]
+    old, other = Constant(1.0), Constant(2.0)
+    predictions.predict(old, row, namespace="Bangalore", version="v1")
+    predictions.predict(other, row, namespace="Delhi", version="v1")
+    assert predictions.stats()["size"] == 2
+
+    new = Constant(3.0)
+    assert predictions.predict(new, row, namespace="Bangalore", version="v2")[0] == 3.0
+    assert predictions.predict(other, row, namespace="Delhi", version="v1")[0] == 2.0
+    stats = predictions.stats()
+    assert stats["size"] == 2
+    assert stats["version_changes"] == 1
+    assert (old.calls, new.calls, other.calls) == (1, 1, 1)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+sklearn_ensemble = pytest.importorskip("sklearn.ensemble")
+
+import engine
+from engine import FEATURES
+
+
+@pytest.fixture(scope="module")
+def forest():
+    """A small forest trained with missing values, so nodes route NaN both ways."""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 300, (2000, len(FEATURES)))
+    y = X[:, 0] * 1.5 + X[:, 1] * 0.5 + np.sqrt(X[:, 4]) * 10
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = sklearn_ensemble.RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0)
+    return model.fit(pd.DataFrame(X, columns=FEATURES), y)
+
+
+@pytest.fixture(scope="module")
+def compiled(forest):
+    # Through the JSON artifact, as the app loads it
+    return engine.TreeEnsemble.from_dict(engine.TreeEnsemble.from_estimator(forest).to_dict())
+
+
+def rows(forest, n=3000, seed=1):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 300, (n, len(FEATURES)))
+    # Values exactly on (and a float32 step either side of) real split thresholds
+    tree = forest.estimators_[0].tree_
+    split = np.flatnonzero((tree.children_left != -1) & np.isfinite(tree.threshold))[:n // 3]
+    for i, node in enumerate(split):
+        threshold = tree.threshold[node]
+        X[3 * i:3 * i + 3, tree.feature[node]] = [
+            threshold, np.nextafter(np.float32(threshold), -np.inf), np.nextafter(np.float32(threshold), np.inf)]
+    return X
+
+
+def test_matches_sklearn_on_finite_and_boundary_rows(forest, compiled):
+    X = pd.DataFrame(rows(forest), columns=FEATURES)
+    np.testing.assert_allclose(compiled.predict(X), forest.predict(X))
+
+
+def test_routes_missing_values_like_sklearn(forest, compiled):
+    X = rows(forest, seed=2)
+    X[np.random.default_rng(3).random(X.shape) < 0.3] = np.nan
+    X[0] = np.nan
+    X = pd.DataFrame(X, columns=FEATURES)
+    np.testing.assert_allclose(compiled.predict(X), forest.predict(X))
+
+
+def test_reordered_columns(forest, compiled):
+    X = pd.DataFrame(rows(forest, n=200, seed=4), columns=FEATURES)
+    reordered = X[FEATURES[::-1]]
+    np.testing.assert_allclose(compiled.predict(reordered), forest.predict(X))
+
+
+def test_large_batch_needs_no_pickle(forest, compiled):
+    n = compiled.CHUNK_PAIRS // compiled.n_trees * 3 + 7  # several chunks and a partial one
+    X = pd.DataFrame(rows(forest, n=n, seed=5), columns=FEATURES)
+    np.testing.assert_allclose(compiled.predict(X), forest.predict(X))
+
+
+def test_artifact_without_missing_routing_refuses_nan(compiled):
+    data = compiled.to_dict()
+    del data["arrays"]["missing_left"]
+    old = engine.TreeEnsemble.from_dict(data)
+    X = np.full((1, len(FEATURES)), 50.0)
+    assert old.predict(X) == pytest.approx(compiled.predict(X))
+    X[0, 2] = np.nan
+    with pytest.raises(ValueError):
+        old.predict(X)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import online
+from online import FEATURES
+
+
+def dataset(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 300, (n, len(FEATURES)))
+    y = 20 + X @ np.array([0.9, 0.4, 0.2, 0.1, 3.0, 0.3]) + rng.normal(0, 5, n)
+    return X, y
+
+
+def least_squares(X, y, weights=None):
+    X1 = np.column_stack([np.ones(len(X)), X])
+    w = np.ones(len(X)) if weights is None else np.sqrt(weights)
+    return np.linalg.lstsq(X1 * w[:, None], y * w, rcond=None)[0]
+
+
+def test_updates_match_refit_on_all_rows():
+    X, y = dataset()
+    rls = online.RecursiveLeastSquares.from_data(X[:200], y[:200])
+    rls.update_many(X[200:], y[200:])
+
+    np.testing.assert_allclose(rls.theta, least_squares(X, y), rtol=1e-6, atol=1e-6)
+    assert rls.count == len(X)
+    np.testing.assert_allclose(rls.to_model().predict(X), np.column_stack([np.ones(len(X)), X]) @ rls.theta)
+
+
+def test_forgetting_matches_weighted_refit():
+    X, y = dataset(seed=1)
+    forgetting = 0.99
+    rls = online.RecursiveLeastSquares.from_data(X[:200], y[:200], forgetting=forgetting)
+    rls.update_many(X[200:], y[200:])
+
+    # Each update scales everything seen before it by ``forgetting``
+    age = np.concatenate([np.full(200, len(X) - 200), np.arange(len(X) - 200)[::-1]])
+    np.testing.assert_allclose(rls.theta, least_squares(X, y, forgetting ** age), rtol=1e-6, atol=1e-6)
+
+
+def test_state_round_trip(tmp_path):
+    X, y = dataset(n=100)
+    rls = online.RecursiveLeastSquares.from_data(X, y, forgetting=0.999)
+    path = tmp_path / "li.rls.json"
+    rls.save(str(path))
+    loaded = online.RecursiveLeastSquares.load(str(path))
+    np.testing.assert_array_equal(loaded.theta, rls.theta)
+    np.testing.assert_array_equal(loaded.P, rls.P)
+    assert (loaded.forgetting, loaded.count) == (rls.forgetting, rls.count)
+    with pytest.raises(ValueError):
+        online.RecursiveLeastSquares(rls.theta, rls.P, forgetting=0)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import quality
+from quality import FEATURES
+
+
+def readings(n=400, seed=0):
+    """A noisy station series with every kind of fault mixed in."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(80, 8, (n, len(FEATURES))).clip(1)
+    X[50:62, 1] = X[50, 1]          # stuck sensor
+    X[100, 0] = 900                  # spike
+    X[150:153] *= 4                  # episode across all pollutants
+    X[200, 2] = -3                   # negative
+    X[210, 3] = 1e6                  # out of range
+    X[rng.random(X.shape) < 0.03] = np.nan
+    times = [f"t{i}" for i in range(n)]
+    times[300] = times[299]          # duplicate timestamp
+    return X, times
+
+
+@pytest.mark.parametrize("batch", [1, 7, 64])
+def test_batches_match_one_row_at_a_time(batch):
+    X, times = readings()
+    whole = quality.StreamValidator()
+    expected = whole.check_many("s", X, times)
+    assert not all(verdict.ok for verdict in expected)
+
+    split = quality.StreamValidator()
+    verdicts = []
+    for start in range(0, len(X), batch):
+        if batch == 1:
+            verdicts.append(split.check("s", X[start], times[start]))
+        else:
+            verdicts.extend(split.check_many("s", X[start:start + batch], times[start:start + batch]))
+
+    assert verdicts == expected
+    assert split.stats() == whole.stats()
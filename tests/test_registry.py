@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import engine
+import registry
+
+
+def export(locations, rows=40, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for location in locations:
+        frame = pd.DataFrame(rng.uniform(1, 300, (rows, len(engine.FEATURES))), columns=engine.FEATURES)
+        frame["AQI"] = frame[engine.FEATURES].sum(axis=1) / 3
+        frame["City"] = location
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_locations_keep_display_names(tmp_path):
+    source = tmp_path / "stations.csv"
+    export(["Bengaluru / Peenya", "Delhi"]).to_csv(source, index=False)
+    models_dir = tmp_path / "models"
+    registry.build(str(source), str(models_dir))
+    assert sorted(p.name for p in models_dir.iterdir()) == ["Bengaluru_Peenya.json", "Delhi.json"]
+
+    models = registry.ModelRegistry(str(models_dir), defaults={})
+    assert models.locations() == ["Bengaluru / Peenya", "Delhi"]
+    model = models.get("Bengaluru / Peenya")
+    assert model.metadata == {"location": "Bengaluru / Peenya"}
+    # Measured from the loaded arrays, not the JSON file
+    assert models.stats()["loaded_bytes"] == model.coef.nbytes
+
+
+def test_files_without_metadata_use_their_stem(tmp_path):
+    engine.LinearModel(np.ones(len(engine.FEATURES)), 0.0).save(str(tmp_path / "Pune.json"))
+    models = registry.ModelRegistry(str(tmp_path), defaults={})
+    assert models.locations() == ["Pune"]
+    assert models.get("Pune").predict(np.ones((1, len(engine.FEATURES))))[0] == len(engine.FEATURES)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import history
+import rollups
+
+
+def station_export(start, days, seed=0):
+    """Two stations in one city reporting every day, in the dataset's CSV layout."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq="D")
+    frames = []
+    for station in ("North", "South"):
+        frame = pd.DataFrame({"City": "Testville", "Station": station, "Date": dates.strftime(history.DATE_FORMAT)})
+        for column in rollups.COLUMNS:
+            frame[column] = rng.uniform(10, 400, days).round(1)
+        frames.append(frame)
+    data = pd.concat(frames, ignore_index=True)
+    data.loc[3, "PM10"] = np.nan
+    return data
+
+
+def build(tmp_path, name, data):
+    source = tmp_path / f"{name}.csv"
+    data.to_csv(source, index=False)
+    store = tmp_path / name
+    history.convert(str(source), str(store), by="Station")
+    return rollups.Rollups.build(history.HistoryStore(str(store)))
+
+
+def test_stations_count_once_per_day(tmp_path):
+    data = station_export("2021-01-01", 365)
+    result = build(tmp_path, "store", data)
+
+    year = result.cities["Testville"]["buckets"]["year"]["2021"]
+    assert year["days"] == 365
+    assert sum(year["categories"]) == 365
+    daily_aqi = data.groupby("Date")["AQI"].mean()
+    table = result.table("Testville", "year")
+    assert table.loc["2021", "AQI"] == pytest.approx(daily_aqi.mean())
+
+
+def test_append_matches_rebuild(tmp_path):
+    data = station_export("2021-11-15", 120)
+    dates = pd.to_datetime(data["Date"], format=history.DATE_FORMAT)
+    cut = pd.Timestamp("2022-01-10")
+
+    full = build(tmp_path, "full", data)
+    partial = build(tmp_path, "partial", data[dates < cut])
+    rest = data[dates >= cut].sample(frac=1, random_state=0)  # stations interleaved, out of order
+    rest_times = pd.to_datetime(rest["Date"], format=history.DATE_FORMAT).to_numpy()
+    partial.append("Testville", rest_times, rest[rollups.COLUMNS].to_numpy(dtype=float))
+
+    for grain in rollups.GRAINS:
+        pd.testing.assert_frame_equal(partial.table("Testville", grain), full.table("Testville", grain))
+    assert partial.cities["Testville"]["last"] == full.cities["Testville"]["last"]
+
+    with pytest.raises(ValueError):
+        partial.append("Testville", rest_times[:1], rest[rollups.COLUMNS].to_numpy(dtype=float)[:1])
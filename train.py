@@ -0,0 +1,180 @@
+"""Reproducible training and model selection (replaces the notebook workflow).
+
+Runs seeded k-fold cross-validation for every candidate model in a process
+pool, caches each (model, fold) result on disk so re-runs skip unchanged work,
+refits the best model on all rows and writes it for the app together with a
+metrics/timing report.
+
+Usage:
+    python train.py [Bangalore_AQI_Dataset.csv] [--folds 5] [--jobs N] [--seed 42]
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+import engine
+
+FEATURES = engine.FEATURES
+TARGET = 'AQI'
+DEFAULT_CACHE_DIR = ".train_cache"
+
+
+def candidate_models(seed):
+    """The models compared in assign.ipynb, seeded where they are random."""
+    return {
+        "LinearRegression": LinearRegression(),
+        "DecisionTreeRegressor": DecisionTreeRegressor(random_state=seed),
+        "RandomForestRegressor": RandomForestRegressor(n_estimators=100, random_state=seed, n_jobs=1),
+        "KNeighborsRegressor": KNeighborsRegressor(n_neighbors=5),
+    }
+
+
+def load_data(path):
+    """Reads the dataset and returns (X, y) with rows missing any value dropped."""
+    data = pd.read_csv(path, encoding='utf-8-sig')
+    data = data.dropna(subset=FEATURES + [TARGET])
+    return data[FEATURES], data[TARGET]
+
+
+def task_key(name, estimator, fold, folds, seed, data_hash):
+    """Cache key for one fold: changes when the data, split or model parameters change."""
+    params = json.dumps(estimator.get_params(), sort_keys=True, default=str)
+    text = f"{name}|{params}|{fold}/{folds}|{seed}|{data_hash}"
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+def run_fold(name, estimator, X, y, train_idx, test_idx):
+    """Fits one model on one fold and returns its metrics. Runs in a worker process."""
+    start = time.perf_counter()
+    estimator.fit(X.iloc[train_idx], y.iloc[train_idx])
+    fit_seconds = time.perf_counter() - start
+    y_pred = estimator.predict(X.iloc[test_idx])
+    y_test = y.iloc[test_idx]
+    return {
+        "model": name,
+        "r2": float(r2_score(y_test, y_pred)),
+        "mse": float(mean_squared_error(y_test, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def cross_validate(X, y, folds=5, seed=42, jobs=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Cross-validates every candidate, in parallel, reusing cached fold results.
+
+    Returns {model name: [fold result, ...]}.
+    """
+    data_hash = hashlib.sha256(pd.util.hash_pandas_object(pd.concat([X, y], axis=1)).values).hexdigest()
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=seed).split(X))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    results = {name: [None] * folds for name in candidate_models(seed)}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for name, estimator in candidate_models(seed).items():
+            for fold, (train_idx, test_idx) in enumerate(splits):
+                cache_path = os.path.join(cache_dir, f"{task_key(name, estimator, fold, folds, seed, data_hash)}.json")
+                if os.path.exists(cache_path):
+                    with open(cache_path) as file:
+                        results[name][fold] = dict(json.load(file), cached=True)
+                    continue
+                future = pool.submit(run_fold, name, estimator, X, y, train_idx, test_idx)
+                pending[future] = (name, fold, cache_path)
+
+        for future, (name, fold, cache_path) in pending.items():
+            result = future.result()
+            with open(cache_path, 'w') as file:
+                json.dump(result, file)
+            results[name][fold] = dict(result, cached=False)
+    return results
+
+
+def summarize(results):
+    """Mean and standard deviation of each metric per model."""
+    summary = {}
+    for name, fold_results in results.items():
+        summary[name] = {}
+        for metric in ("r2", "mse", "rmse", "mae", "fit_seconds"):
+            values = np.array([result[metric] for result in fold_results])
+            summary[name][metric] = float(values.mean())
+            summary[name][f"{metric}_std"] = float(values.std())
+        summary[name]["cached_folds"] = sum(result["cached"] for result in fold_results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate candidate AQI models and save the best one.")
+    parser.add_argument("data", nargs="?", default="Bangalore_AQI_Dataset.csv")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--model-out", default=engine.DEFAULT_PICKLE, help="Where to pickle the winner (default: li.pkl)")
+    parser.add_argument("--artifact-out", default=engine.DEFAULT_ARTIFACT,
+                        help="Where to export the winner for the NumPy engine (default: li.json)")
+    parser.add_argument("--report", default="train_report.json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    X, y = load_data(args.data)
+    results = cross_validate(X, y, args.folds, args.seed, args.jobs, args.cache_dir)
+    cv_seconds = time.perf_counter() - start
+    summary = summarize(results)
+
+    best = min(summary, key=lambda name: summary[name]["rmse"])
+    estimator = candidate_models(args.seed)[best]
+    fit_start = time.perf_counter()
+    estimator.fit(X, y)
+    refit_seconds = time.perf_counter() - fit_start
+
+    with open(args.model_out, 'wb') as file:
+        pickle.dump(estimator, file)
+    try:
+        engine.export(estimator, args.artifact_out)
+        artifact = args.artifact_out
+    except ValueError:
+        # The engine can't evaluate this model type; make sure the app falls back to the pickle
+        if os.path.exists(args.artifact_out):
+            os.remove(args.artifact_out)
+        artifact = None
+
+    report = {
+        "data": args.data,
+        "rows": int(len(X)),
+        "folds": args.folds,
+        "seed": args.seed,
+        "jobs": args.jobs or os.cpu_count(),
+        "best_model": best,
+        "model_file": args.model_out,
+        "artifact_file": artifact,
+        "cv_seconds": cv_seconds,
+        "refit_seconds": refit_seconds,
+        "models": summary,
+    }
+    with open(args.report, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    for name, metrics in sorted(summary.items(), key=lambda item: item[1]["rmse"]):
+        print(f"{name:<24} RMSE {metrics['rmse']:.3f} ± {metrics['rmse_std']:.3f}  "
+              f"R2 {metrics['r2']:.4f}  fit {metrics['fit_seconds']:.3f}s  "
+              f"({metrics['cached_folds']}/{args.folds} folds cached)")
+    print(f"Best: {best} -> {args.model_out}" + (f", {artifact}" if artifact else ""))
+    print(f"Cross-validation took {cv_seconds:.2f}s with {report['jobs']} workers; report in {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""What-if sweeps and reduction targets for the AQI model.
+
+Evaluates a dense grid over one or two pollutants, holding the others at a
+base reading, in a single vectorized ``predict`` call, and solves for the
+smallest reduction that brings the predicted AQI into a target category
+("how much must PM2.5 fall to get AQI to 100 or below?").
+
+Usage:
+    python whatif.py solve 37.4 73.4 56.4 77.5 0.71 64.6 --pollutant PM2.5 --target 100
+    python whatif.py sweep 37.4 73.4 56.4 77.5 0.71 64.6 --x PM2.5 --y PM10 --points 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import aqi_index
+import engine
+
+FEATURES = engine.FEATURES
+DEFAULT_POINTS = 1000
+SOLVER_POINTS = 10_001
+# Targets offered to planners: the highest AQI of each category below Hazardous
+TARGETS = {str(name): float(bound) for name, bound in
+           zip(aqi_index.CATEGORY_NAMES, aqi_index.CATEGORY_UPPER_BOUNDS) if np.isfinite(bound)}
+# Largest heatmap sent to the browser; the full grid is still computed and solved
+MAX_CHART_CELLS = 120
+
+
+def default_range(name, base_value):
+    """(low, high) sweep range for a pollutant: zero up to twice the reading or the Poor band edge."""
+    edge = aqi_index.CONCENTRATION_BREAKPOINTS[FEATURES.index(name), 3]
+    return 0.0, float(max(2 * base_value, edge))
+
+
+def grid_rows(base, x_name, x_values, y_name=None, y_values=None):
+    """Rows of readings for every grid point, the base reading everywhere else.
+
+    Returns an (n, 6) array; with two pollutants rows run over x fastest (shape (len(y), len(x))).
+    """
+    base = np.asarray(base, dtype=float)
+    x_values = np.asarray(x_values, dtype=float)
+    if y_name is None:
+        rows = np.tile(base, (len(x_values), 1))
+        rows[:, FEATURES.index(x_name)] = x_values
+        return rows
+    y_values = np.asarray(y_values, dtype=float)
+    rows = np.tile(base, (len(y_values) * len(x_values), 1))
+    rows[:, FEATURES.index(x_name)] = np.tile(x_values, len(y_values))
+    rows[:, FEATURES.index(y_name)] = np.repeat(y_values, len(x_values))
+    return rows
+
+
+def sweep(model, base, x_name, x_values, y_name=None, y_values=None):
+    """Predicted AQI over the grid: shape (len(x),) or (len(y), len(x))."""
+    aqi = np.asarray(model.predict(grid_rows(base, x_name, x_values, y_name, y_values)), dtype=float)
+    return aqi if y_name is None else aqi.reshape(len(y_values), len(x_values))
+
+
+def _first_crossing(model, base, index, values, target):
+    """Index of the first of ``values`` (checked in order) whose prediction is <= target, or None."""
+    rows = np.tile(base, (len(values), 1))
+    rows[:, index] = values
+    meets = np.asarray(model.predict(rows), dtype=float) <= target
+    hits = np.flatnonzero(meets)
+    return int(hits[0]) if len(hits) else None
+
+
+def min_reduction(model, base, pollutant, target, points=SOLVER_POINTS):
+    """Smallest cut in ``pollutant`` that brings predicted AQI to ``target`` or below.
+
+    Scans from the current reading down to zero in one vectorized call, then
+    refines between the two grid points around the crossing with a second one,
+    so the answer is within base / points**2. Works for non-linear models too,
+    since it only relies on predictions. Returns None if even zero isn't enough.
+    """
+    base = np.asarray(base, dtype=float)
+    index = FEATURES.index(pollutant)
+    current = base[index]
+    values = np.linspace(current, 0.0, points)
+    hit = _first_crossing(model, base, index, values, target)
+    if hit is None:
+        return None
+    if hit > 0:
+        fine = np.linspace(values[hit - 1], values[hit], points)
+        value = fine[_first_crossing(model, base, index, fine, target)]
+    else:
+        value = current
+    row = base.copy()
+    row[index] = value
+    return {
+        "pollutant": pollutant,
+        "target": float(target),
+        "current": float(current),
+        "value": float(value),
+        "reduction": float(current - value),
+        "percent": float((current - value) / current) if current > 0 else 0.0,
+        "aqi": float(np.asarray(model.predict(row[None, :]), dtype=float)[0]),
+    }
+
+
+def frontier(aqi, x_values, y_values, target):
+    """For each x, the highest y on the grid whose AQI meets ``target`` (NaN if none)."""
+    meets = aqi <= target
+    # Last True along y for each column
+    last = len(y_values) - 1 - np.argmax(meets[::-1], axis=0)
+    return np.where(meets.any(axis=0), np.asarray(y_values, dtype=float)[last], np.nan)
+
+
+def best_combined(base, x_name, x_values, y_name, y_values, aqi, target):
+    """Grid point meeting ``target`` with the smallest combined percentage cut of both pollutants."""
+    base = np.asarray(base, dtype=float)
+    bx, by = base[FEATURES.index(x_name)], base[FEATURES.index(y_name)]
+    x_values, y_values = np.asarray(x_values, dtype=float), np.asarray(y_values, dtype=float)
+    cut_x = np.clip((bx - x_values) / bx, 0, None) if bx > 0 else np.zeros_like(x_values)
+    cut_y = np.clip((by - y_values) / by, 0, None) if by > 0 else np.zeros_like(y_values)
+    cost = np.where(aqi <= target, cut_y[:, None] + cut_x[None, :], np.inf)
+    if not np.isfinite(cost).any():
+        return None
+    iy, ix = np.unravel_index(np.argmin(cost), cost.shape)
+    return {x_name: float(x_values[ix]), y_name: float(y_values[iy]), "aqi": float(aqi[iy, ix]),
+            "cut": {x_name: float(cut_x[ix]), y_name: float(cut_y[iy])}}
+
+
+# --- Charts for the app ---
+# Plain Vega-Lite specs for st.vega_lite_chart, with the sweep as named DataFrame datasets
+# (sent to the browser as Arrow): building and validating the same layers in Altair costs
+# tens of milliseconds per rerun. Fields are named x/y because Vega-Lite reads the dot in
+# "PM2.5" as a nested field.
+def _category_color():
+    names = [str(name) for name in aqi_index.CATEGORY_NAMES[:-1]]
+    colors = [str(color) for color in aqi_index.CATEGORY_COLORS[:-1]]
+    return {"field": "Category", "type": "nominal", "scale": {"domain": names, "range": colors}}
+
+
+def _tooltip(*axes):
+    return [dict(axis) for axis in axes] + [{"field": "AQI", "type": "quantitative"},
+                                            {"field": "Category", "type": "nominal"}]
+
+
+def line_chart(x_name, x_values, aqi, target, current=None):
+    """AQI along one pollutant, coloured by category, with the target line."""
+    import pandas as pd
+
+    step = max(1, len(x_values) // 2000)
+    data = pd.DataFrame({"x": x_values[::step], "AQI": aqi[::step], "Category": aqi_index.categorize(aqi[::step])})
+    x_axis = {"field": "x", "type": "quantitative", "title": x_name}
+    layers = [
+        {"data": {"name": "sweep"}, "mark": {"type": "circle", "size": 12},
+         "encoding": {"x": x_axis, "y": {"field": "AQI", "type": "quantitative"}, "color": _category_color(),
+                      "tooltip": _tooltip(x_axis)}},
+        {"data": {"values": [{"AQI": float(target)}]}, "mark": {"type": "rule", "strokeDash": [6, 4]},
+         "encoding": {"y": {"field": "AQI", "type": "quantitative"}}},
+    ]
+    if current is not None:
+        layers.append({"data": {"values": [{"x": float(current)}]}, "mark": {"type": "rule", "color": "white"},
+                       "encoding": {"x": x_axis}})
+    return {"datasets": {"sweep": data}, "layer": layers}
+
+
+def heatmap_chart(x_name, x_values, y_name, y_values, aqi, target=None, base=None):
+    """Category-band heatmap of a 2-D sweep, downsampled for the browser, with the target frontier."""
+    import pandas as pd
+
+    sy = max(1, len(y_values) // MAX_CHART_CELLS)
+    sx = max(1, len(x_values) // MAX_CHART_CELLS)
+    xs, ys, grid = x_values[::sx], y_values[::sy], aqi[::sy, ::sx]
+    data = pd.DataFrame({
+        "x": np.tile(xs, len(ys)),
+        "y": np.repeat(ys, len(xs)),
+        "AQI": grid.ravel().round(1),
+        "Category": aqi_index.categorize(grid.ravel()),
+    })
+    width_x, width_y = (xs[1] - xs[0] if len(xs) > 1 else 1), (ys[1] - ys[0] if len(ys) > 1 else 1)
+    data["x2"], data["y2"] = data["x"] + width_x, data["y"] + width_y
+    x_axis = {"field": "x", "type": "quantitative", "title": x_name}
+    y_axis = {"field": "y", "type": "quantitative", "title": y_name}
+    datasets = {"grid": data}
+    layers = [{
+        "data": {"name": "grid"}, "mark": "rect",
+        "encoding": {"x": x_axis, "x2": {"field": "x2"}, "y": y_axis, "y2": {"field": "y2"},
+                     "color": _category_color(), "tooltip": _tooltip(x_axis, y_axis)},
+    }]
+    if target is not None:
+        edge = frontier(aqi, x_values, y_values, target)
+        step = max(1, len(x_values) // 500)
+        datasets["frontier"] = pd.DataFrame({"x": x_values[::step], "y": edge[::step]}).dropna()
+        layers.append({"data": {"name": "frontier"}, "mark": {"type": "line", "color": "black", "strokeWidth": 2},
+                       "encoding": {"x": x_axis, "y": y_axis}})
+    if base is not None:
+        point = {"x": float(base[FEATURES.index(x_name)]), "y": float(base[FEATURES.index(y_name)])}
+        layers.append({"data": {"values": [point]},
+                       "mark": {"type": "point", "shape": "cross", "size": 200, "color": "white", "filled": True},
+                       "encoding": {"x": x_axis, "y": y_axis}})
+    return {"datasets": datasets, "layer": layers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep pollutants and solve for AQI reduction targets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    solve_cmd = sub.add_parser("solve", help="Smallest cut in one pollutant that reaches a target AQI")
+    solve_cmd.add_argument("--pollutant", default="PM2.5", choices=FEATURES)
+    solve_cmd.add_argument("--target", type=float, default=TARGETS["Moderate"],
+                           help="Highest acceptable AQI (default: 100, the top of Moderate)")
+    sweep_cmd = sub.add_parser("sweep", help="Time a dense sweep over one or two pollutants")
+    sweep_cmd.add_argument("--x", default="PM2.5", choices=FEATURES)
+    sweep_cmd.add_argument("--y", choices=FEATURES)
+    sweep_cmd.add_argument("--points", type=int, default=DEFAULT_POINTS, help="Grid points per axis")
+    for command in (solve_cmd, sweep_cmd):
+        command.add_argument("base", type=float, nargs=len(FEATURES), metavar="VALUE",
+                             help=f"Base reading: {' '.join(FEATURES)}")
+        command.add_argument("--model", default=engine.DEFAULT_ARTIFACT,
+                             help="Model artifact or pickle (default: li.json, falling back to li.pkl)")
+    args = parser.parse_args()
+
+    model = engine.load_model(args.model)
+    if args.command == "solve":
+        start = time.perf_counter()
+        result = min_reduction(model, args.base, args.pollutant, args.target)
+        seconds = time.perf_counter() - start
+        if result is None:
+            print(f"Even zero {args.pollutant} leaves the predicted AQI above {args.target:g}.")
+        else:
+            print(f"Cut {args.pollutant} by {result['reduction']:.2f} ({result['percent']:.1%}), "
+                  f"from {result['current']:.2f} to {result['value']:.2f}: predicted AQI {result['aqi']:.2f} "
+                  f"(solved in {seconds * 1000:.1f} ms)")
+        return
+
+    x_values = np.linspace(*default_range(args.x, args.base[FEATURES.index(args.x)]), args.points)
+    y_values = None
+    if args.y:
+        y_values = np.linspace(*default_range(args.y, args.base[FEATURES.index(args.y)]), args.points)
+    start = time.perf_counter()
+    aqi = sweep(model, args.base, args.x, x_values, args.y, y_values)
+    seconds = time.perf_counter() - start
+    print(f"{aqi.size:,} points in {seconds * 1000:.1f} ms; AQI {aqi.min():.1f} to {aqi.max():.1f}")
+
+
+if __name__ == "__main__":
+    main()